@@ -0,0 +1,68 @@
+"""
+Benchmark of the envelope methods in utils.envelope against scipy.signal.hilbert,
+on audio with awkward (odd and prime) numbers of samples.
+
+Reports wall time and peak memory allocated by numpy (tracemalloc) for each method.
+
+Run from the repository root:
+    python -m benchmarks.bench_envelope --duration 60 --sample-rate 96000
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import scipy.signal as signal
+from utils.envelope import hilbert_envelope, rectified_envelope, band_energy_envelope
+
+
+def next_prime(n):
+    def is_prime(k):
+        if k < 2 or k % 2 == 0:
+            return k == 2
+        return all(k % d for d in range(3, int(k**0.5) + 1, 2))
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def measure(function, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    wall_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, wall_time, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=60, help='approximate length of the audio in seconds')
+    parser.add_argument('--sample-rate', type=int, default=96000)
+    parser.add_argument('--cutoff', type=int, default=17000, help='high-pass cutoff frequency in Hz')
+    args = parser.parse_args()
+
+    n_samples = int(args.duration * args.sample_rate)
+    lengths = {'odd': n_samples + 1 - n_samples % 2, 'prime': next_prime(n_samples)}
+    rng = np.random.default_rng(0)
+
+    for name, length in lengths.items():
+        audio = rng.normal(0, 0.001, length).astype(np.float32)
+        print(f"{name} length: {length} samples")
+        reference, wall_time, peak = measure(lambda x: np.abs(signal.hilbert(x)), audio.astype(np.float64))
+        print(f"  {'scipy.signal.hilbert':24s} {wall_time:8.3f} s {peak / 1e6:10.1f} MB")
+        methods = {
+            'hilbert exact float64': (hilbert_envelope, (audio, np.float64, None)),
+            'hilbert float64': (hilbert_envelope, (audio, np.float64)),
+            'hilbert float32': (hilbert_envelope, (audio, np.float32)),
+            'rectify': (rectified_envelope, (audio, args.sample_rate, args.cutoff)),
+            'band_energy': (band_energy_envelope, (audio,)),
+        }
+        for method, (function, function_args) in methods.items():
+            envelope, wall_time, peak = measure(function, *function_args)
+            difference = np.abs(envelope - reference)
+            print(f"  {method:24s} {wall_time:8.3f} s {peak / 1e6:10.1f} MB   median difference {np.median(difference):.2e} max {np.max(difference):.2e}")
+
+
+if __name__ == "__main__":
+    main()
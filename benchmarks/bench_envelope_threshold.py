@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of EnvelopeDetector.get_envelope_threshold against the per-sample loop it replaced.
+
+Run from the repository root:
+    python -m benchmarks.bench_envelope_threshold --duration 600 --sample-rate 96000
+"""
+import argparse
+import time
+import numpy as np
+from detectors.envelope import EnvelopeDetector
+
+
+def loop_envelope_threshold(envelope_data, lower_threshold=0.003, upper_threshold=0.02):
+    # the original implementation of EnvelopeDetector.get_envelope_threshold
+    binary_array1 = (envelope_data > lower_threshold).astype(int)
+    binary_array2 = (envelope_data < upper_threshold).astype(int)
+    binary_array = binary_array1 + binary_array2
+    for i in range(0,len(binary_array)):
+        if binary_array[i] == 1:
+            binary_array[i] = 0
+    return binary_array
+
+
+def synthetic_envelope(n_samples, seed=0):
+    # smoothed noise with occasional loud calls and spikes, in the range of real envelopes
+    rng = np.random.default_rng(seed)
+    envelope_data = np.abs(rng.normal(0.0015, 0.001, n_samples))
+    calls = rng.integers(0, n_samples, n_samples // 20000)
+    for call in calls:
+        envelope_data[call:call + 8000] += rng.uniform(0.002, 0.03)
+    return envelope_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=600, help='length of the file in seconds')
+    parser.add_argument('--sample-rate', type=int, default=96000)
+    parser.add_argument('--skip-loop', action='store_true', help='only time the vectorised labelling')
+    args = parser.parse_args()
+
+    n_samples = int(args.duration * args.sample_rate)
+    detector = EnvelopeDetector.__new__(EnvelopeDetector)
+    envelope_data = synthetic_envelope(n_samples)
+    print(f"{n_samples} samples ({args.duration} s at {args.sample_rate} Hz)")
+
+    start = time.perf_counter()
+    labels = detector.get_envelope_threshold(envelope_data, 0.003, 0.02)
+    vectorised_time = time.perf_counter() - start
+    print(f"vectorised: {vectorised_time:.4f} s, {labels.nbytes / 1e6:.1f} MB of {labels.dtype} labels")
+
+    if not args.skip_loop:
+        start = time.perf_counter()
+        loop_labels = loop_envelope_threshold(envelope_data, 0.003, 0.02)
+        loop_time = time.perf_counter() - start
+        print(f"loop:       {loop_time:.4f} s, {loop_labels.nbytes / 1e6:.1f} MB of {loop_labels.dtype} labels")
+        print(f"speedup:    {loop_time / vectorised_time:.0f}x, labels equal: {np.array_equal(labels, loop_labels)}")
+
+
+if __name__ == "__main__":
+    main()
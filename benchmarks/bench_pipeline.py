@@ -0,0 +1,164 @@
+"""
+Benchmark of each stage of the detection and scoring pipeline on synthetic recordings.
+
+For each file length and sample rate a recording of noise with disyllabic calls injected at known
+times (benchmarks.synthetic) is written with its Raven selection table, and each stage is timed
+on its own: loading the file, highpass_filter, template correlation, Hilbert envelope, run-length
+post-processing of the detections, writing the selection table and SCORE scoring against the
+injected calls. The best and mean of --repeats runs of each stage are written as JSON, with the
+samples per second, so a regression in any one stage is visible.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --durations 60 600 --sample-rates 96000 192000 --output pipeline.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+import scipy
+from utils.audio_processing import read_audio, highpass_filter
+from utils.envelope import hilbert_envelope
+from utils.intervals import get_intervals_of_mask
+from utils.filesystem.audiofiles import AudioFiles
+from utils.filesystem.selectionfiles import SelectionFiles, ManualFiles
+from utils.filesystem.selectionwriter import SelectionWriter
+from utils.score import SCORE
+from detectors.correlate import CorrelateDetector
+from benchmarks.synthetic import make_call, synthesize_recording, write_wav, write_raven_selections
+
+# the template recording is one call in a second of noise
+TEMPLATE_DURATION = 1
+TEMPLATE_START_TIME = 0.3
+
+
+def time_stage(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times), sum(times) / len(times)
+
+
+def write_recording(data_dir, duration, sample_rate, args):
+    """
+    Write the synthetic recording, its manual selection table and a template recording of one call.
+    """
+    filename = '6_20230316_000000.wav'
+    audio, begin_times, end_times = synthesize_recording(duration, sample_rate, args.calls_per_second, args.noise_level, args.call_amplitude, args.seed)
+    write_wav(f"{data_dir}/{filename}", audio, sample_rate)
+    write_raven_selections(f"{data_dir}/manual.selections.txt", begin_times, end_times)
+
+    # the template is the loudest call the recordings contain, over the same noise floor
+    template, _, _ = synthesize_recording(TEMPLATE_DURATION, sample_rate, 0, args.noise_level, args.call_amplitude, args.seed)
+    call = make_call(sample_rate) * args.call_amplitude
+    template_start = int(TEMPLATE_START_TIME * sample_rate)
+    template[template_start:template_start + len(call)] += call.astype(np.float32)
+    write_wav(f"{data_dir}/template.wav", template, sample_rate)
+    return filename, len(begin_times), TEMPLATE_START_TIME, (template_start + len(call)) / sample_rate
+
+
+def bench_recording(data_dir, duration, sample_rate, args):
+    filename, n_calls, template_begin, template_end = write_recording(data_dir, duration, sample_rate, args)
+    path_to_file = f"{data_dir}/{filename}"
+    n_files = math.ceil(duration / AudioFiles.FILE_LENGTH)
+    files = AudioFiles(data_dir, [], [], total_files=n_files, files_list=[filename])
+    detector = CorrelateDetector(files, f"{data_dir}/template.wav", template_begin, template_end, args.cutoff,
+                                 threshold=args.threshold, write_path=f"{data_dir}/detector.selections.txt")
+
+    def write_selections():
+        with SelectionWriter(detector.write_path) as writer:
+            writer.write(detector.convert_single_file_to_deployment_selections(filename, 0))
+
+    def score():
+        detector_selection = SelectionFiles(data_dir, [], [], total_files=n_files, files_list=[os.path.basename(detector.write_path)])
+        manual_selection = ManualFiles(data_dir, [], [], total_files=n_files, manual_file_path='manual.selections.txt')
+        return SCORE(detector_selection, manual_selection, 'bench').scores_for_pr_curve()
+
+    (audio, _), *load_times = time_stage(lambda: read_audio(path_to_file), args.repeats)
+    filtered, *filter_times = time_stage(lambda: highpass_filter(audio, args.cutoff, sample_rate), args.repeats)
+    score_array, *correlate_times = time_stage(lambda: detector.correlator.correlate(filtered), args.repeats)
+    _, *envelope_times = time_stage(lambda: hilbert_envelope(filtered), args.repeats)
+    _, *interval_times = time_stage(lambda: detector.set_intervals(*get_intervals_of_mask(score_array > args.threshold), len(score_array)), args.repeats)
+    _, *write_times = time_stage(write_selections, args.repeats)
+    score_count, *score_times = time_stage(score, args.repeats)
+
+    stages = {
+        'load': load_times,
+        'highpass_filter': filter_times,
+        'correlation': correlate_times,
+        'hilbert_envelope': envelope_times,
+        'run_length': interval_times,
+        'write_selections': write_times,
+        'score': score_times,
+    }
+    results = []
+    for stage, (best, mean) in stages.items():
+        results.append({
+            'stage': stage,
+            'duration': duration,
+            'sample_rate': sample_rate,
+            'n_samples': len(audio),
+            'best_seconds': best,
+            'mean_seconds': mean,
+            'samples_per_second': len(audio) / best if best > 0 else None,
+        })
+    summary = {
+        'duration': duration,
+        'sample_rate': sample_rate,
+        'injected_calls': n_calls,
+        'detections': len(detector.intervals[0]),
+        'score_count': {label: int(count) for label, count in score_count.items()},
+    }
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=float, nargs='+', default=[60, 600], help='lengths of the recordings in seconds')
+    parser.add_argument('--sample-rates', type=int, nargs='+', default=[96000])
+    parser.add_argument('--calls-per-second', type=float, default=0.5)
+    parser.add_argument('--noise-level', type=float, default=0.001, help='standard deviation of the noise floor')
+    parser.add_argument('--call-amplitude', type=float, default=0.02, help='peak amplitude of the loudest calls')
+    parser.add_argument('--cutoff', type=int, default=17000, help='high-pass cutoff frequency in Hz')
+    parser.add_argument('--threshold', type=float, default=0.0125, help='correlation threshold')
+    parser.add_argument('--repeats', type=int, default=3, help='runs of each stage, the best and mean are reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=None, help='directory to keep the synthetic recordings in, a temporary directory if not given')
+    parser.add_argument('--output', default=None, help='JSON file to write, standard output if not given')
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'pipeline',
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'config': vars(args),
+        'results': [],
+        'recordings': [],
+    }
+    # the progress printed by the pipeline goes to standard error, to keep standard output JSON
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(sys.stderr):
+        for duration in args.durations:
+            for sample_rate in args.sample_rates:
+                data_dir = f"{args.data_dir or tmp_dir}/{duration:g}s_{sample_rate}Hz"
+                os.makedirs(data_dir, exist_ok=True)
+                results, summary = bench_recording(data_dir, duration, sample_rate, args)
+                report['results'].extend(results)
+                report['recordings'].append(summary)
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark of the import time of each entry point, and which heavy libraries each one loads.
+
+Every import is timed in a fresh interpreter, the best of --repeats runs is reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    'main',
+    'detectors.correlate',
+    'detectors.envelope',
+    'utils.audio_processing',
+    'utils.score',
+]
+HEAVY_LIBRARIES = ['numpy', 'scipy', 'pandas', 'librosa', 'soundfile', 'matplotlib', 'seaborn', 'sklearn']
+
+TIMING_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {libraries!r} if name in sys.modules]
+print(elapsed, ','.join(loaded))
+"""
+
+
+def time_import(module, repeats):
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', TIMING_SCRIPT.format(module=module, libraries=HEAVY_LIBRARIES)],
+                                capture_output=True, text=True, check=True).stdout
+        elapsed, loaded = output.split()[0], (output.split() + [''])[1]
+        if best is None or float(elapsed) < best:
+            best = float(elapsed)
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        elapsed, loaded = time_import(module, args.repeats)
+        print(f"{module:24s} {elapsed:7.3f} s   loads: {loaded.replace(',', ', ') or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Synthetic recordings for the benchmarks: noise with Brachyphisis-like disyllabic calls injected at known times,
+written as 16-bit WAV files with matching Raven selection tables.
+"""
+import wave
+import numpy as np
+
+RAVEN_COLUMNS = ['Selection', 'View', 'Channel', 'Begin Time (s)', 'End Time (s)', 'Low Freq (Hz)', 'High Freq (Hz)', 'Tags']
+
+
+def make_call(sample_rate, carrier_freq=25000, syllable_time=0.04, gap_time=0.02):
+    """
+    One disyllabic call: two Hann-windowed tone syllables separated by a short gap, peak amplitude 1.
+    """
+    syllable_len = int(syllable_time * sample_rate)
+    gap_len = int(gap_time * sample_rate)
+    syllable = np.hanning(syllable_len) * np.sin(2 * np.pi * carrier_freq * np.arange(syllable_len) / sample_rate)
+    return np.concatenate((syllable, np.zeros(gap_len), syllable))
+
+
+def synthesize_recording(duration, sample_rate, calls_per_second=0.5, noise_level=0.001, call_amplitude=0.02, seed=0):
+    """
+    Gaussian noise with calls injected at random times.
+
+    Returns
+    -------
+    audio : numpy.ndarray
+        float32 audio in [-1, 1).
+    begin_times, end_times : numpy.ndarray
+        The start and end of each injected call in seconds.
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sample_rate)
+    audio = rng.normal(0, noise_level, n_samples)
+    call = make_call(sample_rate)
+    # calls at least one call length apart
+    n_calls = rng.poisson(calls_per_second * duration)
+    slots = np.arange(0, n_samples - len(call), 2 * len(call))
+    starts = np.sort(rng.choice(slots, size=min(n_calls, len(slots)), replace=False))
+    for start in starts:
+        # calls from faint to loud
+        audio[start:start + len(call)] += call * call_amplitude * rng.uniform(0.25, 1)
+    audio = np.clip(audio, -1, 1 - 2**-15).astype(np.float32)
+    return audio, starts / sample_rate, (starts + len(call)) / sample_rate
+
+
+def write_wav(filename, audio, sample_rate):
+    """
+    Write mono float audio as a 16-bit PCM WAV file.
+    """
+    with wave.open(filename, 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes((audio * 2**15).astype('<i2').tobytes())
+
+
+def write_raven_selections(filename, begin_times, end_times, low_freq=11000, high_freq=37000, tag='Brachyphisis'):
+    """
+    Write calls as a Raven selection table, like the manual annotations.
+    """
+    with open(filename, 'w') as file:
+        file.write('\t'.join(RAVEN_COLUMNS) + '\n')
+        for selection, (begin_time, end_time) in enumerate(zip(begin_times, end_times), start=1):
+            file.write(f"{selection}\tSpectrogram 1\t1\t{float(begin_time)}\t{float(end_time)}\t{low_freq}\t{high_freq}\t{tag}\n")
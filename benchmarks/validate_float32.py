@@ -0,0 +1,81 @@
+"""
+Validation of the float32 signal pipeline against float64 on reference audio files.
+
+Each detector is run on every file with dtype=numpy.float64 and dtype=numpy.float32, and the
+detections are compared: the number of detections, how many match exactly, the largest shift
+of a detection's start or end in samples and the fraction of samples labelled differently.
+Wall time and peak memory allocated by numpy (tracemalloc) are reported for each precision.
+
+Run from the repository root:
+    python -m benchmarks.validate_float32 path/to/deployment 6_20230316_000000.wav 6_20230316_050000.wav \\
+        --template path/to/template.wav
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from utils.filesystem.audiofiles import AudioFiles
+from utils.intervals import get_mask_of_intervals
+from detectors.correlate import CorrelateDetector
+from detectors.envelope import EnvelopeDetector
+
+
+def run_detector(detector, path_to_file):
+    tracemalloc.start()
+    start = time.perf_counter()
+    detector.detect_with_detector(path_to_file)
+    wall_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return detector.intervals, detector.n_samples, wall_time, peak
+
+
+def compare_intervals(reference, intervals, n_samples):
+    (ref_starts, ref_ends), (starts, ends) = reference, intervals
+    matched = len(set(zip(ref_starts, ref_ends)) & set(zip(starts, ends)))
+    if len(ref_starts) == len(starts) and len(starts):
+        max_shift = int(max(np.max(np.abs(ref_starts - starts)), np.max(np.abs(ref_ends - ends))))
+    elif len(ref_starts) == len(starts):
+        max_shift = 0
+    else:
+        # a detection was split, joined or lost, so the detections cannot be paired
+        max_shift = None
+    differing = np.count_nonzero(get_mask_of_intervals(ref_starts, ref_ends, n_samples) != get_mask_of_intervals(starts, ends, n_samples))
+    return matched, max_shift, differing / n_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root_dir', help='directory of the audio files')
+    parser.add_argument('files', nargs='+', help='audio files in root_dir to validate on')
+    parser.add_argument('--template', required=True, help='audio file containing the correlation template')
+    parser.add_argument('--template-start', type=float, default=0.062)
+    parser.add_argument('--template-end', type=float, default=0.144)
+    args = parser.parse_args()
+
+    files = AudioFiles(args.root_dir, [], [], files_list=args.files)
+    detectors = {
+        'correlate': lambda dtype: CorrelateDetector(files, args.template, args.template_start, args.template_end, write_path='', dtype=dtype),
+        'envelope': lambda dtype: EnvelopeDetector(files, write_path='', dtype=dtype),
+    }
+    for name, make_detector in detectors.items():
+        print(name)
+        detector64, detector32 = make_detector(np.float64), make_detector(np.float32)
+        totals = {'float64': [0.0, 0], 'float32': [0.0, 0]}
+        for filename in args.files:
+            path_to_file = f"{args.root_dir}/{filename}"
+            intervals64, n_samples, time64, peak64 = run_detector(detector64, path_to_file)
+            intervals32, _, time32, peak32 = run_detector(detector32, path_to_file)
+            matched, max_shift, differing = compare_intervals(intervals64, intervals32, n_samples)
+            totals['float64'][0] += time64
+            totals['float64'][1] = max(totals['float64'][1], peak64)
+            totals['float32'][0] += time32
+            totals['float32'][1] = max(totals['float32'][1], peak32)
+            print(f"  {filename}: {len(intervals64[0])} detections (float64), {len(intervals32[0])} (float32), "
+                  f"{matched} identical, largest shift {max_shift} samples, {differing:.2e} of samples differ")
+        for precision, (wall_time, peak) in totals.items():
+            print(f"  {precision}: {wall_time:8.3f} s {peak / 1e6:10.1f} MB peak")
+
+
+if __name__ == "__main__":
+    main()
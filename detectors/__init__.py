@@ -1,165 +1,485 @@
 import abc
+import os
+import contextlib
+import json
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from utils.audio_processing import get_filtered_audio_from_file
+from utils.audio_processing import get_filtered_audio_from_file, iter_filtered_audio_blocks, get_baseband_audio
+from utils.intervals import fill_small_gaps, remove_short_intervals, get_selection_bounds, get_mask_of_intervals, get_interval_peaks, DetectionResult
 from utils.filesystem.audiofiles import AudioFiles
-import pandas as pd
+from utils.filesystem.selectionwriter import SelectionWriter
+from utils.filesystem.manifest import RunManifest
+from utils.profiling import profile_stage, profile_file, use_profiler, set_profiler, get_profiler, pop_records
 
 class BaseDetector(metaclass=abc.ABCMeta):
-    def __init__(self, files:AudioFiles, filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000) -> None:
+    # the per-sample arrays of the last file, only kept by detect_with_detector(retain=True) or when plotting
+    SIGNALS = ('filtered_audio', 'result')
+
+    def __init__(self, files:AudioFiles, filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,block_size=None,cache=None,dtype=None,band=None) -> None:
         self.filter_cutoff_freq = filter_cutoff_freq
         self.files = files
         self.max_interval_len = max_interval_length
         self.min_disyllabic_len = min_disyllabic_len
+        # number of samples per block when streaming files, None loads each file whole
+        self.block_size = block_size
+        # utils.cache.FilteredAudioCache to share filtered audio between detectors and runs, None filters every time
+        self.cache = cache
+        # working precision of the signal pipeline. None filters in float64 and lets each detector choose,
+        # numpy.float32 keeps filtering, envelope and correlation in float32, numpy.float64 keeps them in float64
+        self.dtype = dtype
+        # (low, high) band in Hz to detect in at complex baseband, None detects in the filtered audio at the full sample rate
+        if band is not None and block_size is not None:
+            raise ValueError("Cannot stream baseband audio, set block_size=None or band=None")
+        self.band = band
+        # the factor the sample rate is divided by at baseband, sample-based parameters are divided by it too
+        self.decimation = 1
         self.result = None
-        self.all_selections = None
+        # detections as (starts, ends) sample intervals
+        self.intervals = None
+        self.n_samples = None
+        # the peak of the detector's signal in each detection, None if it is not tracked
+        self.peaks = None
         self.filtered_audio = None
 
     def __str__(self) -> str:
         pass
 
+    def get_cache_dtype(self):
+        """
+        The precision of the filtered audio from the cache, float32 unless the detector's dtype is float64.
+        """
+        return np.float32 if self.dtype is None else self.dtype
+
     def get_filtered_audio(self, filename):
-        filtered_audio, audio_data, self.sample_rate = get_filtered_audio_from_file(filename,self.filter_cutoff_freq)
-        return filtered_audio
-    
-    def _get_segments_of_labels(self, ones=True):
-        '''
-        ones=True, means getting starts and ends of 1 segments
-        ones=False, means getting starts and ends of 0 segments
-        '''
-        if ones:
-            s_val = 2
-            e_val = -2
-            val = 2
+        if self.cache is not None:
+            filtered_audio, self.sample_rate = self.cache.get_filtered_audio(filename, self.filter_cutoff_freq, dtype=self.get_cache_dtype())
         else:
-            s_val = -2
-            e_val = 2
-            val = 0
-        # Find the number of continuous 1s segments
-        diffs = np.diff(self.result)
-        starts = np.where(diffs == s_val)[0] + 1  # Start indices of 1s
-        ends = np.where(diffs == e_val)[0] + 1   # End indices of 1s
-
-        # If the array starts with 0, include the first segment
-        if self.result[0] == val:
-            starts = np.insert(starts, 0, 0)
-
-        # If the array ends with 2, include the last segment
-        if self.result[-1] == val:
-            ends = np.append(ends, len(self.result) - 1)
-        
-        return starts, ends
-    
-
-    def replace_small_zero_sequences(self):
-        if self.result is None:
-            raise ValueError("self.result is None")
-        # Find the number of continuous 0s segments
-        starts, ends = self._get_segments_of_labels(ones=False)
-        
-        # Iterate over each sequence of zeros
-        count = 0
-        for start, end in zip(starts, ends):
-            if (end - start) < self.max_interval_len:
-                self.result[start:end] = 2
-                count += 1
-        return self.result
+            filtered_audio, audio_data, self.sample_rate = get_filtered_audio_from_file(filename,self.filter_cutoff_freq,dtype=self.dtype)
+        if self.band is not None:
+            # detection times are in seconds of the baseband sample rate, so they map straight back to the file
+            with profile_stage('baseband', len(filtered_audio)):
+                filtered_audio, self.sample_rate, self.decimation = get_baseband_audio(filtered_audio, self.sample_rate, *self.band, dtype=self.dtype)
+        return filtered_audio
+
+    def get_scaled_length(self, n_samples):
+        """
+        Convert a number of samples at the file's sample rate to the sample rate being detected at.
+        """
+        return max(int(round(n_samples / self.decimation)), 1)
+
+    def get_filtered_audio_blocks(self, filename, context=(0, 0)):
+        """
+        Stream the filtered audio of a file in blocks of self.block_size samples.
+        See utils.audio_processing.iter_filtered_audio_blocks.
+        """
+        if self.cache is not None:
+            # slices of the memory-mapped cache entry, only the blocks used are read
+            filtered_audio, self.sample_rate = self.cache.get_filtered_audio(filename, self.filter_cutoff_freq, dtype=self.get_cache_dtype())
+            total_samples = len(filtered_audio)
+            for block_start in range(0, total_samples, self.block_size):
+                block_stop = min(block_start + self.block_size, total_samples)
+                out_start = max(block_start - context[0], 0)
+                out_stop = min(block_stop + context[1], total_samples)
+                yield block_start, block_stop, filtered_audio[out_start:out_stop], block_start - out_start
+            return
+
+        for block_start, block_stop, filtered_audio, offset, self.sample_rate in iter_filtered_audio_blocks(filename, self.filter_cutoff_freq, self.block_size, context, self.dtype):
+            yield block_start, block_stop, filtered_audio, offset
 
-    def replace_small_ones_sequences(self):
-        if self.result is None:
-            raise ValueError("self.result is None")
-        # Find the number of continuous 1s segments
-        starts, ends = self._get_segments_of_labels(ones=True)
-        
-        count = 0
-        # Iterate over each sequence of 1s
-        for start, end in zip(starts, ends):
-            if (end - start) < self.min_disyllabic_len:
-                self.result[start:end] = 0
-                count += 1
+    def set_intervals(self, starts, ends, n_samples, run_peaks=None):
+        """
+        Fill the small gaps between and remove the short runs of detections, working on the runs
+        as intervals rather than on every sample.
+
+        Parameters
+        ----------
+        starts, ends : numpy.ndarray
+            The start and (exclusive) end sample of each run of samples over the threshold.
+        n_samples : int
+            The number of samples in the file.
+        run_peaks : numpy.ndarray or None, default None
+            The peak of the detector's signal in each run, for the peak of each detection. None does not track peaks.
+
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray)
+            The starts and ends of the detections.
+        """
+        with profile_stage('intervals', n_samples):
+            intervals = fill_small_gaps(starts, ends, n_samples, self.get_scaled_length(self.max_interval_len))
+            intervals = remove_short_intervals(*intervals, n_samples, self.get_scaled_length(self.min_disyllabic_len))
+            self.peaks = None if run_peaks is None else get_interval_peaks(starts, run_peaks, *intervals)
+        self.intervals = intervals
+        self.n_samples = n_samples
+        return self.intervals
+
+    def get_result(self):
+        """
+        Get the detections of the last file, see utils.intervals.DetectionResult.
+        """
+        return DetectionResult(*self.intervals, self.n_samples, self.sample_rate, self.peaks)
+
+    def release_signals(self):
+        """
+        Drop the per-sample arrays of the last file, so only its detections are kept between files.
+        """
+        for name in self.SIGNALS:
+            setattr(self, name, None)
+
+    def get_result_labels(self):
+        """
+        Get the detections as per-sample labels, 2 in a detection and 0 otherwise. Used for plotting.
+        """
+        if self.intervals is None:
+            raise ValueError("self.intervals is None")
+        self.result = get_mask_of_intervals(*self.intervals, self.n_samples).view(np.uint8) * np.uint8(2)
         return self.result
-    
 
     def get_selections_for_single_file(self,filename):
-        
-        data = {
-            "Begin Time (s)": [],
-            "End Time (s)": [],
-            "Low Freq (Hz)": [],
-            "High Freq (Hz)": [],
-            "Begin File": [],
-            "File Offset (s)": [],
-            "Tags": [],
-            "Correct": []
-        }
-        df = pd.DataFrame(data)
+        starts, ends = get_selection_bounds(*self.intervals, self.n_samples)
+        return self.get_selections_of_samples(starts, ends, filename)
 
-        starts, ends = self._get_segments_of_labels(ones=True)
+    def get_selections_of_samples(self, starts, ends, filename):
+        """
+        Get the selections of detections from start to end samples of a file, relative to the start of the file.
+        """
+        # pandas is only imported once there are selections to write, to keep worker start up fast
+        import pandas as pd
 
-        for i in range(0, len(starts)):
-            new_row = {
-                "Begin Time (s)": starts[i] / self.sample_rate,
-                "End Time (s)": ends[i] / self.sample_rate,
-                "Low Freq (Hz)": 11000,
-                "High Freq (Hz)": 37000,
-                "Begin File": filename,
-                "File Offset (s)": starts[i] / self.sample_rate,
-                "Tags": "Brachyphisis",
-                "Correct": "Y"
-            }
+        begin_times = starts / self.sample_rate
 
-            df.loc[i] = new_row
+        # all the rows of the file at once, from the start and end arrays
+        df = pd.DataFrame({
+            "Begin Time (s)": begin_times,
+            "End Time (s)": ends / self.sample_rate,
+            "Low Freq (Hz)": 11000.0,
+            "High Freq (Hz)": 37000.0,
+            "Begin File": filename,
+            "File Offset (s)": begin_times,
+            "Tags": "Brachyphisis",
+            "Correct": "Y"
+        }, index=pd.RangeIndex(len(starts)))
 
         return df
 
 
-    def convert_single_file_to_deployment_selections(self,filename):
-        df = self.get_selections_for_single_file(filename)
-        
+    def convert_single_file_to_deployment_selections(self,filename,filenumber):
+        with profile_stage('selections'):
+            df = self.get_selections_for_single_file(filename)
+            return self.offset_to_deployment(df, filenumber)
+
+    def offset_to_deployment(self, df, filenumber):
         # change begin and end time to be relative to the start of the deployment 
         # so it works for paging the whole deployment 
-        df['Begin Time (s)'] = df['Begin Time (s)'] + (self.files.FILE_LENGTH * self.files.filenumber)
-        df['End Time (s)'] = df['End Time (s)'] + (self.files.FILE_LENGTH * self.files.filenumber)
+        # the offset comes from the file's position in files_list, so it does not
+        # depend on how many files have already been processed
+        offset = self.files.get_offset(filenumber)
+        df['Begin Time (s)'] = df['Begin Time (s)'] + offset
+        df['End Time (s)'] = df['End Time (s)'] + offset
 
         return df
 
-    def detect_with_detector(self,path_to_file, plot=False):
+    def detect_with_detector(self,path_to_file, plot=False, retain=False):
+        """
+        Detect katydids in a file.
+
+        The per-sample arrays (filtered audio, correlation, envelope) are released once the detections
+        are found, unless retain is True or plot is True, for the plotting methods.
+
+        Returns
+        -------
+        utils.intervals.DetectionResult
+        """
         raise NotImplementedError(
             'detect_with_detector method not implemented in derived class'
         )
 
-    def detect_one_file(self, filename):
+    def get_threshold_params(self):
+        """
+        Get the detector's threshold parameters, by name, with their current values.
+        """
+        raise NotImplementedError(
+            'get_threshold_params method not implemented in derived class'
+        )
+
+    def get_runs_for_thresholds(self, path_to_file, thresholds):
+        """
+        Get the runs of samples over each of several thresholds, computing the file's signal once.
+
+        Parameters
+        ----------
+        path_to_file : String
+        thresholds : list of tuple
+            The values of the parameters of get_threshold_params, in the same order.
+
+        Returns
+        -------
+        dict
+            (starts, ends, n_samples) of the runs, before gap filling and short run removal, for each threshold.
+        """
+        raise NotImplementedError(
+            'get_runs_for_thresholds method not implemented in derived class'
+        )
+
+    def get_parameter_combinations(self, param_grid):
+        """
+        Get every combination of the values in param_grid. Parameters not in param_grid keep the detector's value.
+        """
+        defaults = {'max_interval_length': self.max_interval_len, 'min_disyllabic_len': self.min_disyllabic_len}
+        defaults.update(self.get_threshold_params())
+        unknown = set(param_grid) - set(defaults)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)}, must be in {list(defaults)}")
+        names = list(defaults)
+        # per-template thresholds are tuples, so combinations can be used as keys
+        values = [[tuple(value) if np.ndim(value) else value for value in param_grid.get(name, [defaults[name]])] for name in names]
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+    def sweep_one_file(self, filename, filenumber, combinations):
+        """
+        Detect katydids in a single file with each combination of parameters.
+
+        Returns
+        -------
+        list of pandas.DataFrame or None
+            The selections for each combination, relative to the start of the deployment,
+            or None if the file does not exist.
+        """
+        threshold_names = list(self.get_threshold_params())
+        thresholds = list(dict.fromkeys(tuple(params[name] for name in threshold_names) for params in combinations))
+        try:
+            path_to_file = f"{self.files.root_dir}/{filename}"
+            print(f"Starting .... {filename}")
+            runs = self.get_runs_for_thresholds(path_to_file, thresholds)
+        except FileNotFoundError:
+            print(f"File ({filename}) does not exist ... Skipping......")
+            return None
+
+        all_selections = []
+        for params in combinations:
+            starts, ends, n_samples = runs[tuple(params[name] for name in threshold_names)]
+            starts, ends = fill_small_gaps(starts, ends, n_samples, self.get_scaled_length(params['max_interval_length']))
+            self.intervals = remove_short_intervals(starts, ends, n_samples, self.get_scaled_length(params['min_disyllabic_len']))
+            self.n_samples = n_samples
+            self.peaks = None
+            all_selections.append(self.convert_single_file_to_deployment_selections(filename, filenumber))
+        return all_selections
+
+    def sweep(self, param_grid, n_workers=1):
+        """
+        Detect katydids in every file of the deployment with every combination of parameters in param_grid.
+
+        Each file's signal (the correlation or envelope) is computed once and thresholded for all the
+        combinations, so a sweep costs about one detection run. The selections are kept in memory
+        for scoring with utils.score.SCORE.scores_for_sweep, and can be written with write_sweep.
+
+        Parameters
+        ----------
+        param_grid : dict
+            The values to try for each parameter, e.g. {'threshold': [0.01, 0.0125], 'max_interval_length': [10000, 12000]}.
+            The parameters are max_interval_length, min_disyllabic_len and those of get_threshold_params.
+        n_workers : int or None, default 1
+            The number of worker processes, as for detect.
+
+        Returns
+        -------
+        list of tuple(dict, pandas.DataFrame)
+            The parameters of each combination and its selections for the deployment.
+        """
+        import pandas as pd
+        if n_workers is None:
+            n_workers = os.cpu_count()
+
+        combinations = self.get_parameter_combinations(param_grid)
+        filenumbers = range(len(self.files.files_list))
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(self,)) as executor:
+                file_selections = list(executor.map(_sweep_one_file_in_worker, self.files.files_list, filenumbers, itertools.repeat(combinations)))
+        else:
+            file_selections = [self.sweep_one_file(filename, filenumber, combinations) for filename, filenumber in zip(self.files.files_list, filenumbers)]
+        file_selections = [selections for selections in file_selections if selections is not None]
+
+        results = []
+        for i, params in enumerate(combinations):
+            tables = [selections[i] for selections in file_selections]
+            if tables:
+                selections = pd.concat(tables, axis=0, ignore_index=True)
+            else:
+                selections = pd.DataFrame(columns=SelectionWriter.COLUMNS)
+            results.append((params, selections))
+        return results
+
+    def write_sweep(self, sweep_results, write_dir):
+        """
+        Write each combination of a sweep to its own selection table in write_dir.
+
+        Returns
+        -------
+        list of String
+            The path written for each combination.
+        """
+        os.makedirs(write_dir, exist_ok=True)
+        write_paths = []
+        for params, selections in sweep_results:
+            name = "_".join(f"{format_param_value(value)}{param}" for param, value in params.items())
+            write_path = f"{write_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{name}.txt"
+            with SelectionWriter(write_path) as writer:
+                # restart the index for each file, as detect does
+                for _, file_selections in selections.groupby('Begin File', sort=False):
+                    writer.write(file_selections.reset_index(drop=True))
+            write_paths.append(write_path)
+        return write_paths
+
+    def detect_one_file(self, filename, filenumber):
+        """
+        Detect katydids in a single file of the deployment.
+
+        Parameters
+        ----------
+        filename : String
+            The name of the audio file in self.files.root_dir.
+        filenumber : int
+            The index of the file in self.files.files_list. Used for the deployment offset.
+
+        Returns
+        -------
+        pandas.DataFrame or None
+            The selections for the file relative to the start of the deployment,
+            or None if the file does not exist.
+        """
         try:
             path_to_file = f"{self.files.root_dir}/{filename}"
             print(f"Starting .... {filename}")
-            self.detect_with_detector(path_to_file)
-            selections = self.convert_single_file_to_deployment_selections(f"{filename}")
-            self.all_selections = pd.concat([self.all_selections,selections], axis=0)
-            self.files.update_filenumber()
+            with profile_file(filename), profile_stage('detect') as stage:
+                self.detect_with_detector(path_to_file)
+                stage.n_samples = self.n_samples
+                return self.convert_single_file_to_deployment_selections(f"{filename}", filenumber)
         except FileNotFoundError:
             print(f"File ({filename}) does not exist ... Skipping......")
+            return None
 
 
-    def detect(self):
-        # the max interval between disyllabic in number of samples 
-        # the min length of disyllabic in number of samples
-        data = {
-            "Begin Time (s)": [],
-            "End Time (s)": [],
-            "Low Freq (Hz)": [],
-            "High Freq (Hz)": [],
-            "Begin File": [],
-            "File Offset (s)": [],
-            "Tags": [],
-            "Correct": []
+    def watch(self, poll_interval=10, settle_time=30, max_idle_polls=None):
+        """
+        Detect katydids in the files of self.files.root_dir as they arrive, writing their selections to self.write_path
+        as each is finished. self.write_path is overwritten when watching starts, and every recording in the folder
+        is detected again after a restart. See detectors.watch.FolderWatcher.
+        """
+        from .watch import FolderWatcher
+        FolderWatcher(self, poll_interval, settle_time).run(max_idle_polls)
+
+    def get_params(self):
+        """
+        Get the parameters that change the detections, to recognise the results of an earlier run.
+        """
+        return {
+            'detector': type(self).__name__,
+            'filter_cutoff_freq': self.filter_cutoff_freq,
+            'max_interval_length': self.max_interval_len,
+            'min_disyllabic_len': self.min_disyllabic_len,
+            'block_size': self.block_size,
+            'dtype': None if self.dtype is None else np.dtype(self.dtype).name,
+            # the cache stores the filtered audio at its own precision
+            'cache_dtype': None if self.cache is None else np.dtype(self.get_cache_dtype()).name,
+            'band': self.band,
+            # the offsets of an indexed deployment come from the real file lengths, checked for each file by the manifest
+            'file_length': self.files.FILE_LENGTH if self.files.index is None else 'index',
         }
-        self.all_selections = pd.DataFrame(data)
-        
-        self.files.reset_filenumber()
-        for filename in self.files.files_list:
-            self.detect_one_file(filename)
-        self.files.reset_filenumber()
-        
-        self.all_selections.to_csv(self.write_path, header=True, sep='\t')
 
+    def get_params_hash(self):
+        params = json.dumps(self.get_params(), sort_keys=True, default=str)
+        return hashlib.sha1(params.encode()).hexdigest()
+
+    def detect(self, n_workers=1, resume=False, profiler=None):
+        """
+        Detect katydids in every file of the deployment and write the selections to self.write_path.
+
+        Each finished file is recorded in a manifest next to the selections (self.write_path + '.manifest.jsonl'),
+        so a run that is interrupted can be resumed.
+
+        Parameters
+        ----------
+        n_workers : int or None, default 1
+            The number of worker processes to run the detector in. 1 runs every file in this process,
+            None uses one worker per CPU. The selections are the same for any number of workers.
+        resume : bool, default False
+            True to reuse the selections of files already finished with the same parameters by an earlier run,
+            False to detect every file again.
+        profiler : utils.profiling.StageProfiler or None, default None
+            Record the time and memory of each stage of each file, including in the worker processes,
+            and print a summary at the end of the run. None does not profile.
+        """
+        if n_workers is None:
+            n_workers = os.cpu_count()
+
+        with use_profiler(profiler):
+            self.detect_files(n_workers, resume, profiler)
+        if profiler is not None:
+            profiler.print_summary()
+
+    def detect_files(self, n_workers, resume, profiler):
+        files_list = self.files.files_list
+        with RunManifest(f"{self.write_path}.manifest.jsonl", self.get_params_hash(), resume) as manifest:
+            # the files finished by an earlier run, their selections are read from the manifest as they are written
+            finished = [manifest.is_finished(filenumber, filename, f"{self.files.root_dir}/{filename}", float(self.files.get_offset(filenumber))) for filenumber, filename in enumerate(files_list)]
+            pending_files = [filename for filename, is_finished in zip(files_list, finished) if not is_finished]
+            pending_numbers = [filenumber for filenumber, is_finished in enumerate(finished) if not is_finished]
+            if len(pending_files) < len(files_list):
+                print(f"Resuming, {len(files_list) - len(pending_files)} of {len(files_list)} files already finished")
+
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(self, profiler)) if n_workers > 1 else contextlib.nullcontext() as executor:
+                if executor is not None:
+                    # each worker gets its own copy of the detector once, then only filenames are sent.
+                    # map gives the results in files_list order so the output does not depend on which worker finished first
+                    results = _add_worker_records(executor.map(_detect_one_file_in_worker, pending_files, pending_numbers))
+                else:
+                    results = map(self.detect_one_file, pending_files, pending_numbers)
+                # each file's selections are appended as soon as it and every file before it are done
+                with SelectionWriter(self.write_path) as writer:
+                    for filenumber, filename in enumerate(files_list):
+                        if finished[filenumber]:
+                            selections = manifest.get_selections(filenumber, filename)
+                        else:
+                            selections = next(results)
+                            if selections is None:
+                                # the file does not exist, it is tried again when resuming
+                                continue
+                            manifest.add(filenumber, filename, f"{self.files.root_dir}/{filename}", selections, float(self.files.get_offset(filenumber)))
+                        with profile_file(filename), profile_stage('write_selections'):
+                            writer.write(selections)
+
+
+def format_param_value(value):
+    """
+    Format a parameter for a file name, joining the values of a per-template parameter with '-'.
+    """
+    if np.ndim(value):
+        return "-".join(str(item) for item in value)
+    return str(value)
+
+
+# detector used by each worker process of BaseDetector.detect
+_worker_detector = None
+
+def _init_worker(detector, profiler=None):
+    global _worker_detector
+    _worker_detector = detector
+    # the worker's copy of the profiler keeps its records to send back with each file
+    set_profiler(profiler)
+
+def _detect_one_file_in_worker(filename, filenumber):
+    return _worker_detector.detect_one_file(filename, filenumber), pop_records()
+
+def _add_worker_records(results):
+    # add the profiling records of each worker's file to the main process's profiler
+    for selections, records in results:
+        if records:
+            get_profiler().add_records(records)
+        yield selections
+
+def _sweep_one_file_in_worker(filename, filenumber, combinations):
+    return _worker_detector.sweep_one_file(filename, filenumber, combinations)
 
-__all__ = ['EnvelopeDetector', 'CorrelateDetector']
\ No newline at end of file
+__all__ = ['EnvelopeDetector', 'CorrelateDetector', 'BandEnergyDetector', 'CascadeDetector']
\ No newline at end of file
@@ -0,0 +1,157 @@
+from . import BaseDetector
+import numpy as np
+from scipy.ndimage import uniform_filter1d, maximum_filter1d
+from utils.spectral import stft_band_power
+from utils.intervals import IntervalTracker, get_intervals_of_mask, get_run_peaks
+from utils.profiling import profile_stage
+
+class BandEnergyDetector(BaseDetector):
+    """
+    Detect katydids from the energy in their band of a strided STFT, relative to the bands next to it.
+
+    The filtered audio is cut into Hann-windowed frames of n_fft samples, hop samples apart, and the
+    mean power per bin in signal_band is compared to the mean power per bin in reference_bands. The ratio
+    is smoothed with the same windows as EnvelopeDetector's envelope, and a frame is a detection when the
+    signal band has more than threshold times the power of the reference bands, so broadband noise such
+    as rain, which raises every band, is not detected. Detection works on frames, so max_interval_length
+    and min_disyllabic_len (in samples) are divided by hop, and the selections are accurate to hop samples. This needs hop times less work after the STFT than the sample-based
+    detectors, for screening many recordings quickly.
+
+    Parameters
+    ----------
+    threshold : float, default 4.0
+        The ratio of signal band to reference band power for a detection.
+    signal_band : tuple(float, float), default (11000, 37000)
+        The band of the calls in Hz.
+    reference_bands : list of tuple(float, float or None), default ((37000, None),)
+        The bands to compare to in Hz. A high frequency of None is the Nyquist frequency.
+        The bands below the high-pass filter's cutoff frequency are filtered out, so they are not used.
+        With filter_cutoff_freq None the audio is not filtered, and the bands alone select the frequencies.
+    n_fft : int, default 256
+        The number of samples in each frame.
+    hop : int, default 128
+        The number of samples between frames. block_size must be a multiple of it.
+    """
+    SIGNALS = BaseDetector.SIGNALS + ('band_ratio',)
+
+    def __init__(self,files, filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,threshold=4.0, write_path=None, block_size=None, signal_band=(11000, 37000), reference_bands=((37000, None),), n_fft=256, hop=128, cache=None, dtype=None) -> None:
+        if block_size is not None and block_size % hop:
+            raise ValueError(f"block_size must be a multiple of hop ({hop})")
+        super().__init__(files, filter_cutoff_freq,max_interval_length,min_disyllabic_len,block_size,cache,dtype)
+        self.threshold = threshold
+        self.signal_band = tuple(signal_band)
+        self.reference_bands = [tuple(band) for band in reference_bands]
+        self.n_fft = n_fft
+        self.hop = hop
+        # detection lengths are in frames, so sample-based parameters are divided by hop
+        self.decimation = hop
+        if write_path is None:
+            self.write_path = f"{self.files.root_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{threshold}bandratio_{self.max_interval_len}interval_{self.min_disyllabic_len}disyllabic.txt"
+        else:
+            self.write_path = write_path
+
+    def __str__(self) -> str:
+        pass
+
+    def calc_band_ratio(self, filtered_audio, start=0, n_frames=None, max_window=500, uniform_window=500):
+        """
+        Get the smoothed ratio of signal band to reference band power of frames centred every hop samples
+        from start (see utils.spectral.stft_band_power). The windows are in samples.
+        """
+        # the STFT is float32 unless the detector's dtype is float64
+        stft_dtype = np.float32 if self.dtype is None else self.dtype
+        with profile_stage('band_energy', len(filtered_audio)):
+            band_power = stft_band_power(filtered_audio, self.sample_rate, [self.signal_band] + self.reference_bands,
+                                         self.n_fft, self.hop, stft_dtype, start, n_frames)
+            reference_power = band_power[:, 1:].mean(axis=1)
+            # silence has no power in any band, and is not a detection
+            band_ratio = band_power[:, 0] / np.maximum(reference_power, np.finfo(stft_dtype).tiny)
+            band_ratio = maximum_filter1d(band_ratio, size=self.get_scaled_length(max_window))
+            band_ratio = uniform_filter1d(band_ratio, size=self.get_scaled_length(uniform_window))
+        # times are in seconds of the frame rate
+        self.frame_rate = self.sample_rate / self.hop
+        return band_ratio
+
+    def detect_with_detector(self, filename, plot=False, retain=False):
+        # the last file's arrays are dropped before this file's are made
+        self.release_signals()
+        if self.block_size is not None:
+            if plot or retain:
+                raise ValueError("Cannot plot or retain the signals when streaming, set block_size=None")
+            return self.detect_with_detector_streaming(filename)
+
+        filtered_audio = self.get_filtered_audio(filename)
+        band_ratio = self.calc_band_ratio(filtered_audio)
+        self.sample_rate = self.frame_rate
+
+        starts, ends = get_intervals_of_mask(band_ratio > self.threshold)
+        self.set_intervals(starts, ends, len(band_ratio), get_run_peaks(band_ratio, starts, ends))
+
+        if plot or retain:
+            self.filtered_audio, self.band_ratio = filtered_audio, band_ratio
+        if plot:
+            self.plot_band_ratio()
+        return self.get_result()
+
+    def detect_with_detector_streaming(self, filename):
+        tracker = IntervalTracker()
+        for band_ratio in self.iter_band_ratio_blocks(filename):
+            tracker.update(band_ratio > self.threshold, band_ratio)
+        self.sample_rate = self.frame_rate
+        self.set_intervals(*tracker.get_intervals(), tracker.length, tracker.get_run_peaks())
+        return self.get_result()
+
+    def iter_band_ratio_blocks(self, filename, max_window=500, uniform_window=500):
+        hop = self.hop
+        # each block is extended by enough frames for the smoothing windows, and half a frame of samples for those frames
+        context_frames = -(-(max_window + uniform_window) // hop)
+        context = context_frames * hop + self.n_fft // 2
+        for block_start, block_stop, filtered_audio, offset in self.get_filtered_audio_blocks(filename, context=(context, context)):
+            out_start = block_start - offset
+            # the block's frames and their context, clipped to the frames of the whole file
+            first_frame = max(block_start // hop - context_frames, 0)
+            stop_frame = min(-(-block_stop // hop) + context_frames, -(-(out_start + len(filtered_audio)) // hop))
+            band_ratio = self.calc_band_ratio(filtered_audio, first_frame * hop - out_start, stop_frame - first_frame, max_window, uniform_window)
+            block_first = block_start // hop - first_frame
+            yield band_ratio[block_first:block_first - (-(block_stop - block_start) // hop)]
+
+    def get_threshold_params(self):
+        return {'threshold': self.threshold}
+
+    def get_params(self):
+        params = super().get_params()
+        params.update({
+            'threshold': self.threshold,
+            'signal_band': self.signal_band,
+            'reference_bands': self.reference_bands,
+            'n_fft': self.n_fft,
+            'hop': self.hop,
+        })
+        return params
+
+    def get_runs_for_thresholds(self, path_to_file, thresholds):
+        if self.block_size is None:
+            band_ratio = self.calc_band_ratio(self.get_filtered_audio(path_to_file))
+            self.sample_rate = self.frame_rate
+            return {key: (*get_intervals_of_mask(band_ratio > key[0]), len(band_ratio)) for key in thresholds}
+
+        trackers = {key: IntervalTracker() for key in thresholds}
+        for band_ratio in self.iter_band_ratio_blocks(path_to_file):
+            for key, tracker in trackers.items():
+                tracker.update(band_ratio > key[0])
+        self.sample_rate = self.frame_rate
+        return {key: (*tracker.get_intervals(), tracker.length) for key, tracker in trackers.items()}
+
+    def plot_band_ratio(self):
+        # matplotlib is only imported when plotting, so detection runs do not load it
+        import matplotlib.pyplot as plt
+        self.result = self.get_result_labels()
+        time = np.arange(len(self.band_ratio)) / self.frame_rate
+        plt.figure(figsize=(14, 6))
+        plt.plot(time, self.band_ratio, label='Band Energy Ratio', color='red')
+        plt.plot(time, self.result * max(self.band_ratio), label='Binary Array', color='green', alpha=0.6)
+        plt.axhline(self.threshold, color='black', linestyle='--')
+        plt.yscale('log')
+        plt.title('Ratio of Signal Band to Reference Band Power')
+        plt.xlabel('Time (s)')
+        plt.show()
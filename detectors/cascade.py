@@ -0,0 +1,225 @@
+from . import BaseDetector, format_param_value
+import time
+import numpy as np
+from utils.audio_processing import open_audio, get_filtered_audio_from_file
+from utils.intervals import get_intervals_of_mask, get_run_peaks
+from utils.profiling import profile_stage
+from .bandenergy import BandEnergyDetector
+
+# the band energy ratio of the default pre-screen, lower than detecting with it so faint calls are still candidates
+PRESCREEN_THRESHOLD = 3.0
+
+class CascadeDetector(BaseDetector):
+    """
+    Detect katydids with a cheap pre-screen gating the template correlation of a CorrelateDetector.
+
+    The pre-screen finds the candidate regions of each file at its own low resolution, by default from
+    the STFT band energy of the unfiltered audio. Only those regions, padded by padding samples each side,
+    are high-pass filtered and correlated at the full sample rate, and the rest of the file is taken to have
+    no detections. The padding covers the template, so every lag whose window reaches a candidate is
+    correlated, and max_interval_length, so runs the correlator would join across a gap are in the same
+    region. Where the pre-screen finds every call the selections are the correlator's, in the same format;
+    measure_recall_loss compares the two to show what the speed costs in sensitivity.
+
+    Parameters
+    ----------
+    correlate_detector : detectors.correlate.CorrelateDetector
+        The detector to gate, its files, filter, thresholds, interval lengths and cache are used.
+        It must load each file whole at the full sample rate (block_size=None and band=None).
+    prescreen : BaseDetector or None, default None
+        The detector of the candidate regions, its runs over its thresholds before gap filling and short run removal
+        are the candidates. None uses get_default_prescreen.
+    padding : int or None, default None
+        The number of samples added each side of the candidate regions. None uses the larger of the template length
+        and max_interval_length, plus two frames of the pre-screen. Must be at least the template length and max_interval_length.
+    write_path : String or None, default None
+    """
+    def __init__(self, correlate_detector, prescreen=None, padding=None, write_path=None) -> None:
+        if correlate_detector.block_size is not None or correlate_detector.band is not None:
+            raise ValueError("The cascade correlates regions of whole files at the full sample rate, set block_size=None and band=None")
+        super().__init__(correlate_detector.files, correlate_detector.filter_cutoff_freq, correlate_detector.max_interval_len, correlate_detector.min_disyllabic_len,
+                         None, correlate_detector.cache, correlate_detector.dtype)
+        self.correlate_detector = correlate_detector
+        if prescreen is None:
+            prescreen = self.get_default_prescreen()
+        self.prescreen = prescreen
+
+        template_len = correlate_detector.correlator.template_len
+        min_padding = max(template_len, self.max_interval_len)
+        if padding is None:
+            # the pre-screen's frames are only accurate to its decimation
+            padding = min_padding + 2 * prescreen.decimation
+        elif padding < min_padding:
+            raise ValueError(f"padding must be at least the template length and max_interval_length ({min_padding} samples)")
+        self.padding = padding
+
+        if write_path is None:
+            self.write_path = f"{self.files.root_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{format_param_value(correlate_detector.threshold)}threshold_cascade_{self.max_interval_len}interval_{self.min_disyllabic_len}disyllabic.txt"
+        else:
+            self.write_path = write_path
+        # the fraction of the last file that was correlated
+        self.screened_fraction = None
+
+    def __str__(self) -> str:
+        pass
+
+    def get_default_prescreen(self):
+        """
+        A BandEnergyDetector on the unfiltered audio, with the STFT selecting the band above the correlator's cutoff
+        frequency instead of the high-pass filter, so no filtering is done at the full sample rate to find the candidates.
+        The frames do not overlap, which halves the work of the STFT, as the candidates are padded by far more than a frame.
+        """
+        return BandEnergyDetector(self.files, filter_cutoff_freq=None, max_interval_length=self.max_interval_len, min_disyllabic_len=self.min_disyllabic_len,
+                                  threshold=PRESCREEN_THRESHOLD, signal_band=(self.filter_cutoff_freq, 37000), reference_bands=((37000, None),), n_fft=256, hop=256)
+
+    def get_candidate_regions(self, path_to_file, n_samples):
+        """
+        Get the padded regions of a file with candidates from the pre-screen, as the (starts, ends) samples of the file.
+        Regions that overlap once padded are joined.
+        """
+        key = tuple(self.prescreen.get_threshold_params().values())
+        with profile_stage('prescreen', n_samples):
+            starts, ends, _ = self.prescreen.get_runs_for_thresholds(path_to_file, [key])[key]
+        decimation = self.prescreen.decimation
+        starts = np.maximum(starts * decimation - self.padding, 0)
+        ends = np.minimum(ends * decimation + self.padding, n_samples)
+        if len(starts) == 0:
+            return starts, ends
+        separate = starts[1:] > ends[:-1]
+        return starts[np.concatenate(([True], separate))], ends[np.concatenate((separate, [True]))]
+
+    def get_filtered_audio_region(self, path_to_file, start, stop):
+        """
+        Get the filtered audio from start to stop samples of a file, the same as those samples of get_filtered_audio.
+        A file already in the cache is sliced from its entry, otherwise only the region is filtered, and not cached.
+        """
+        if self.cache is not None:
+            cached = self.cache.get_cached_audio(path_to_file, self.filter_cutoff_freq, dtype=self.get_cache_dtype())
+            if cached is not None:
+                # a slice of the memory-mapped cache entry
+                filtered_audio, self.sample_rate = cached
+                return filtered_audio[start:stop]
+        filtered_audio, _, self.sample_rate = get_filtered_audio_from_file(path_to_file, self.filter_cutoff_freq, start, stop, self.dtype)
+        return filtered_audio
+
+    def detect_with_detector(self, filename, plot=False, retain=False):
+        # only the regions are correlated, so there are no per-sample arrays of the whole file to keep
+        if plot or retain:
+            raise ValueError("Cannot plot or retain the signals of the cascade, use its correlate detector")
+        key = tuple(self.get_threshold_params().values())
+        starts, ends, run_peaks, n_samples = self.get_region_runs(filename, [key])[key]
+        self.set_intervals(starts, ends, n_samples, run_peaks)
+        return self.get_result()
+
+    def get_threshold_params(self):
+        return self.correlate_detector.get_threshold_params()
+
+    def get_params(self):
+        params = super().get_params()
+        params.update({
+            'correlate': self.correlate_detector.get_params(),
+            'prescreen': self.prescreen.get_params(),
+            'padding': self.padding,
+        })
+        return params
+
+    def get_runs_for_thresholds(self, path_to_file, thresholds):
+        return {key: (starts, ends, n_samples) for key, (starts, ends, _, n_samples) in self.get_region_runs(path_to_file, thresholds).items()}
+
+    def get_region_runs(self, path_to_file, thresholds):
+        """
+        Get the runs of the correlation over each of several thresholds in the candidate regions of a file.
+
+        Returns
+        -------
+        dict
+            (starts, ends, peaks, n_samples) of the runs for each threshold, with the peak score of each run.
+        """
+        audio = open_audio(path_to_file)
+        n_samples = audio.frames
+        self.sample_rate = audio.sample_rate
+        region_starts, region_ends = self.get_candidate_regions(path_to_file, n_samples)
+        self.screened_fraction = np.sum(region_ends - region_starts) / max(n_samples, 1)
+
+        correlators = self.correlate_detector.get_correlators_for_thresholds(thresholds)
+        template_len = max(correlator.template_len for correlator, _ in correlators)
+        runs = {key: ([np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]) for key in thresholds}
+        for start, stop in zip(region_starts, region_ends):
+            # the lags of the region, and the len(template)-1 samples after it for their correlation windows
+            filtered_audio = self.get_filtered_audio_region(path_to_file, start, min(stop + template_len - 1, n_samples))
+            for correlator, score_thresholds in correlators:
+                score = correlator.correlate(filtered_audio, n_lags=stop - start)
+                for key, score_threshold in score_thresholds.items():
+                    starts, ends = get_intervals_of_mask(score > score_threshold)
+                    runs[key][0].append(starts + start)
+                    runs[key][1].append(ends + start)
+                    runs[key][2].append(get_run_peaks(score, starts, ends))
+        return {key: (np.concatenate(starts), np.concatenate(ends), np.concatenate(peaks), n_samples) for key, (starts, ends, peaks) in runs.items()}
+
+    def measure_recall_loss(self, files_list=None):
+        """
+        Detect in each file with both the cascade and the full correlator, to measure the detections the
+        pre-screen loses and the time it saves. A detection of the full correlator is recalled when a
+        detection of the cascade overlaps it, and identical when the cascade has exactly the same detection.
+
+        Each file is read once before timing, so neither detector pays for reading it from disk, and the
+        detectors take turns going first, so neither always finds the other's cache entries.
+
+        Parameters
+        ----------
+        files_list : list of String or None, default None
+            The files of self.files.root_dir to compare on, None for every file of the deployment.
+
+        Returns
+        -------
+        pandas.DataFrame
+            For each file, the number of detections of each detector, the number of the full correlator's
+            detections recalled and identical, the fraction of the file correlated by the cascade,
+            and the time in seconds of each detector.
+        """
+        import pandas as pd
+        if files_list is None:
+            files_list = self.files.files_list
+
+        rows = []
+        for filename in files_list:
+            path_to_file = f"{self.files.root_dir}/{filename}"
+            try:
+                open_audio(path_to_file).read()
+            except FileNotFoundError:
+                print(f"File ({filename}) does not exist ... Skipping......")
+                continue
+            times = {}
+            detectors = [('full', self.correlate_detector), ('cascade', self)]
+            for name, detector in detectors if len(rows) % 2 else detectors[::-1]:
+                start_time = time.perf_counter()
+                detector.detect_with_detector(path_to_file)
+                times[name] = time.perf_counter() - start_time
+
+            full_starts, full_ends = self.correlate_detector.intervals
+            starts, ends = self.intervals
+            # the first cascade detection ending after each full detection starts
+            following = np.searchsorted(ends, full_starts, side='right')
+            recalled = following < len(starts)
+            recalled[recalled] = starts[following[recalled]] < full_ends[recalled]
+            # the cascade detection starting where each full detection starts, if there is one
+            same_start = np.minimum(np.searchsorted(starts, full_starts), max(len(starts) - 1, 0))
+            identical = (starts[same_start] == full_starts) & (ends[same_start] == full_ends) if len(starts) else np.zeros(len(full_starts), dtype=bool)
+            rows.append({
+                'file': filename,
+                'full_detections': len(full_starts),
+                'cascade_detections': len(starts),
+                'recalled': int(np.sum(recalled)),
+                'identical': int(np.sum(identical)),
+                'screened_fraction': self.screened_fraction,
+                'full_time': times['full'],
+                'cascade_time': times['cascade'],
+            })
+
+        report = pd.DataFrame(rows, columns=['file', 'full_detections', 'cascade_detections', 'recalled', 'identical', 'screened_fraction', 'full_time', 'cascade_time'])
+        n_full = report['full_detections'].sum()
+        recall = report['recalled'].sum() / n_full if n_full else 1.0
+        speedup = report['full_time'].sum() / max(report['cascade_time'].sum(), 1e-12)
+        print(f"Cascade recalled {recall:.1%} of {n_full} full correlator detections ({1 - recall:.1%} lost), "
+              f"correlating {report['screened_fraction'].mean():.1%} of the audio, {speedup:.1f} times faster")
+        return report
@@ -1,20 +1,48 @@
-from . import BaseDetector
+from . import BaseDetector, format_param_value
+import hashlib
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import correlate
 from utils.audio_processing import get_audio_segment
+from utils.correlation import TemplateCorrelator, TemplateBankCorrelator, float32_allowed, get_fft_size
+from utils.intervals import IntervalTracker, get_intervals_of_mask, get_run_peaks
+
+COMBINE_METHODS = ('max', 'any')
 
 class CorrelateDetector(BaseDetector):
-    def __init__(self,files, template_filename,template_start_time=0.062,template_end_time=0.144, filter_cutoff_freq=17000,max_interval_length=12000,min_disyllabic_len=5000,threshold=0.0125,write_path=None) -> None:
+    SIGNALS = BaseDetector.SIGNALS + ('corr',)
+
+    def __init__(self,files, template_filename,template_start_time=0.062,template_end_time=0.144, filter_cutoff_freq=17000,max_interval_length=12000,min_disyllabic_len=5000,threshold=0.0125,write_path=None,block_size=None,dtype=None,cache=None,combine='max',band=None) -> None:
         
-        super().__init__(files, filter_cutoff_freq,max_interval_length,min_disyllabic_len)
+        super().__init__(files, filter_cutoff_freq,max_interval_length,min_disyllabic_len,block_size,cache,dtype,band)
         if write_path is None:
-            self.write_path = f"{self.files.root_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{threshold}threshold_{self.max_interval_len}interval_{self.min_disyllabic_len}disyllabic.txt"
+            self.write_path = f"{self.files.root_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{format_param_value(threshold)}threshold_{self.max_interval_len}interval_{self.min_disyllabic_len}disyllabic.txt"
         else:
             self.write_path = write_path
-        self.template, template_file_signal = self.get_template(template_filename,template_start_time,template_end_time)
-        self.norm_factor = self.get_correlation_norm(template_file_signal)
-        self.threshold = threshold
+        if combine not in COMBINE_METHODS:
+            raise ValueError(f"Unknown combine method {combine}, must be one of {COMBINE_METHODS}")
+        if combine == 'max' and np.ndim(threshold) != 0:
+            raise ValueError("threshold must be a single value when combine='max', use combine='any' for one threshold per template")
+        # how the templates of a bank are combined, 'max' thresholds the largest normalised correlation of any template,
+        # 'any' detects when any template is over its own threshold, with threshold a list of one per template
+        self.combine = combine
+        # a tuple of per-template thresholds, so the thresholds can be used as keys of their runs
+        self.threshold = tuple(threshold) if np.ndim(threshold) else threshold
+
+        # a list of template files, with a list of start and end times, is a bank of templates
+        if isinstance(template_filename, str):
+            template_filename, template_start_time, template_end_time = [template_filename], [template_start_time], [template_end_time]
+        template_start_time = np.broadcast_to(template_start_time, len(template_filename))
+        template_end_time = np.broadcast_to(template_end_time, len(template_filename))
+        templates = [self.get_template(filename, start_time, end_time) for filename, start_time, end_time in zip(template_filename, template_start_time, template_end_time)]
+        self.templates = [template for template, template_file_signal in templates]
+        self.template = self.templates[0]
+
+        if dtype is None:
+            # use float32 unless the threshold is too close to its rounding error
+            dtype = self.get_dtype(threshold)
+        # each template's norm factor is its largest correlation with its own file
+        self.norm_factors = [self.get_correlation_norm(template, template_file_signal, dtype) for template, template_file_signal in templates]
+        # the template spectra are computed once here and reused for every file
+        self.correlator = self.get_correlator(threshold, dtype)
 
     def __str__(self) -> str:
         pass
@@ -26,41 +54,141 @@ class CorrelateDetector(BaseDetector):
         filtered_template = get_audio_segment(filtered_signal, start_time, end_time, self.sample_rate)
         return filtered_template, filtered_signal
     
-    def get_correlation_norm(self, template_file_signal):
-        correlation = correlate(template_file_signal, self.template, mode='full')
-        correlation = correlation[len(self.template)-1:]
+    def get_correlation_norm(self, template, template_file_signal, dtype):
+        correlation = TemplateCorrelator(template, dtype).correlate(template_file_signal)
+        if np.iscomplexobj(correlation):
+            # baseband correlation is scored by its magnitude
+            correlation = np.abs(correlation)
         norm_factor = np.max(correlation)
         return norm_factor
+
+    def get_dtype(self, threshold):
+        template_len = max(len(template) for template in self.templates)
+        if float32_allowed(np.min(threshold), get_fft_size(template_len)):
+            return np.float32
+        return np.float64
+
+    def get_correlator(self, threshold, dtype):
+        """
+        Get the correlator of the template bank. Its score is over get_score_threshold(threshold) when there is a detection.
+        """
+        norm_factors = self.norm_factors
+        if self.combine == 'any':
+            # scale each template by its own threshold, so every template detects at a score of 1
+            norm_factors = [norm_factor * template_threshold for norm_factor, template_threshold in zip(norm_factors, np.broadcast_to(threshold, len(self.templates)))]
+        return TemplateBankCorrelator(self.templates, norm_factors, dtype)
+
+    def get_score_threshold(self, threshold):
+        if self.combine == 'any':
+            return 1
+        return threshold
     
-    def normalisedCorrelate(self):
-        # Calculate correlation
-        correlation = correlate(self.filtered_audio, self.template, mode='full')
-        correlation = correlation[len(self.template)-1:]
-        cross_corr_normalised = correlation / self.norm_factor
-        return cross_corr_normalised
+    def normalisedCorrelate(self, filtered_audio):
+        # largest absolute normalised correlation of the templates
+        return self.correlator.correlate(filtered_audio)
         
-    def correlateThreshold(self):
-        binary_array = (abs(self.corr) > self.threshold).astype(int)
-        binary_array = binary_array * 2
+    def correlateThreshold(self, corr):
+        # 2 when over the threshold, 0 otherwise
+        binary_array = (corr > self.get_score_threshold(self.threshold)).view(np.uint8) * np.uint8(2)
         return binary_array
 
-    def detect_with_detector(self,filename, plot=False):
+    def detect_with_detector(self,filename, plot=False, retain=False):
         # the max interval between disyllabic in number of samples 
         # the min length of disyllabic in number of samples
-        
-        self.filtered_audio = self.get_filtered_audio(filename)
+        # the last file's arrays are dropped before this file's are made
+        self.release_signals()
+        if self.block_size is not None:
+            if plot or retain:
+                raise ValueError("Cannot plot or retain the signals when streaming, set block_size=None")
+            return self.detect_with_detector_streaming(filename)
 
-        self.corr = self.normalisedCorrelate()
+        filtered_audio = self.get_filtered_audio(filename)
+        corr = self.normalisedCorrelate(filtered_audio)
 
-        self.result = self.correlateThreshold()    
-        self.result = self.replace_small_zero_sequences()
-        self.result = self.replace_small_ones_sequences()
+        starts, ends = get_intervals_of_mask(corr > self.get_score_threshold(self.threshold))
+        self.set_intervals(starts, ends, len(corr), get_run_peaks(corr, starts, ends))
 
+        if plot or retain:
+            self.filtered_audio, self.corr = filtered_audio, corr
         if plot:
             self.plot_threshold_result()
+        return self.get_result()
     
+    def detect_with_detector_streaming(self, filename):
+        # correlate one block at a time, each block reading
+        # len(template)-1 samples past its end for the correlation window
+        template_len = self.correlator.template_len
+        score_threshold = self.get_score_threshold(self.threshold)
+        tracker = IntervalTracker()
+        for block_start, block_stop, filtered_audio, offset in self.get_filtered_audio_blocks(filename, context=(0, template_len - 1)):
+            score = self.correlator.correlate(filtered_audio[offset:], n_lags=block_stop - block_start)
+            tracker.update(score > score_threshold, score)
+
+        self.set_intervals(*tracker.get_intervals(), tracker.length, tracker.get_run_peaks())
+        return self.get_result()
+
+    def get_threshold_params(self):
+        return {'threshold': self.threshold}
+
+    def get_params(self):
+        params = super().get_params()
+        templates_hash = hashlib.sha1()
+        for template in self.templates:
+            templates_hash.update(np.ascontiguousarray(template).tobytes())
+        params.update({
+            'threshold': self.threshold,
+            'combine': self.combine,
+            'templates': templates_hash.hexdigest(),
+            'correlation_dtype': self.correlator.dtype.name,
+        })
+        return params
+
+    def get_runs_for_thresholds(self, path_to_file, thresholds):
+        runs = {}
+        for correlator, score_thresholds in self.get_correlators_for_thresholds(thresholds):
+            runs.update(self.get_runs_for_correlator(path_to_file, correlator, score_thresholds))
+        return runs
+
+    def get_correlators_for_thresholds(self, thresholds):
+        """
+        Get the correlators needed for several thresholds, each with the score threshold of every threshold it is used for.
+
+        Returns
+        -------
+        list of tuple(TemplateBankCorrelator, dict)
+        """
+        if self.combine == 'any':
+            # the thresholds scale the templates, so each needs its own correlation
+            correlators = []
+            for key in thresholds:
+                dtype = np.float64 if self.get_dtype(key[0]) == np.float64 else self.correlator.dtype
+                correlators.append((self.get_correlator(key[0], dtype), {key: 1}))
+            return correlators
+
+        correlator = self.correlator
+        lowest_threshold = min(threshold for threshold, in thresholds)
+        if correlator.dtype == np.float32 and self.get_dtype(lowest_threshold) == np.float64:
+            correlator = self.get_correlator(self.threshold, np.float64)
+        return [(correlator, {key: key[0] for key in thresholds})]
+
+    def get_runs_for_correlator(self, path_to_file, correlator, score_thresholds):
+        if self.block_size is None:
+            score = correlator.correlate(self.get_filtered_audio(path_to_file))
+            return {key: (*get_intervals_of_mask(score > score_threshold), len(score)) for key, score_threshold in score_thresholds.items()}
+
+        template_len = correlator.template_len
+        trackers = {key: IntervalTracker() for key in score_thresholds}
+        for block_start, block_stop, filtered_audio, offset in self.get_filtered_audio_blocks(path_to_file, context=(0, template_len - 1)):
+            score = correlator.correlate(filtered_audio[offset:], n_lags=block_stop - block_start)
+            for key, tracker in trackers.items():
+                tracker.update(score > score_thresholds[key])
+        return {key: (*tracker.get_intervals(), tracker.length) for key, tracker in trackers.items()}
+
     def plot_threshold_result(self):
+        # matplotlib is only imported when plotting, so detection runs do not load it
+        import matplotlib.pyplot as plt
         # Plot the original audio, envelope, and binary array for visualization
+        self.result = self.get_result_labels()
         time = np.linspace(0, len(self.filtered_audio) / self.sample_rate, num=len(self.filtered_audio))
         plt.figure(figsize=(14, 6))
 
@@ -72,10 +200,10 @@ class CorrelateDetector(BaseDetector):
         plt.ylabel('Amplitude')
 
         plt.subplot(2, 1, 2)
-        plt.title('Correlation between Signal and Template')
+        plt.title('Correlation between Signal and Templates')
         plt.plot(time, self.corr, label='Correlation', color='red')
         plt.plot(time, self.result * max(self.corr), label='Binary Array', color='green', alpha=0.6)
-        plt.axhline(self.threshold,color='black',linestyle='--')
+        plt.axhline(self.get_score_threshold(self.threshold),color='black',linestyle='--')
         plt.xlabel('Time (s)')
         plt.show()
 
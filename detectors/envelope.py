@@ -1,14 +1,22 @@
 from . import BaseDetector
 import numpy as np
-import scipy.signal as signal
-import matplotlib.pyplot as plt
 from scipy.ndimage import uniform_filter1d, maximum_filter1d
+from utils.envelope import get_amplitude_envelope, HILBERT_CONTEXT, HILBERT_BLOCK_SIZE, ENVELOPE_METHODS
+from utils.intervals import IntervalTracker, get_intervals_of_mask, get_run_peaks
+from utils.profiling import profile_stage
 
 class EnvelopeDetector(BaseDetector):
-    def __init__(self,files, filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,lower_faint=0.002,lower_loud=0.003, write_path=None) -> None:
+    SIGNALS = BaseDetector.SIGNALS + ('envelope_data',)
+
+    def __init__(self,files, filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,lower_faint=0.002,lower_loud=0.003, write_path=None, block_size=None, envelope_method='hilbert', cache=None, dtype=None, band=None) -> None:
         self.lower_faint = lower_faint
         self.lower_loud = lower_loud
-        super().__init__(files, filter_cutoff_freq,max_interval_length,min_disyllabic_len)
+        if envelope_method not in ENVELOPE_METHODS:
+            raise ValueError(f"Unknown envelope method {envelope_method}, must be one of {ENVELOPE_METHODS}")
+        # 'hilbert', or the cheaper 'rectify' or 'band_energy', see utils.envelope.
+        # The cheaper envelopes sit lower on noise, so lower_faint and lower_loud may need tuning for them
+        self.envelope_method = envelope_method
+        super().__init__(files, filter_cutoff_freq,max_interval_length,min_disyllabic_len,block_size,cache,dtype,band)
         if write_path is None:
             self.write_path = f"{self.files.root_dir}/Site{self.files.site}_Deployment{self.files.dep}_sel_{self.filter_cutoff_freq}Hz_{self.lower_faint}lower{self.lower_loud}_{self.max_interval_len}interval_{self.min_disyllabic_len}disyllabic.txt"
         else:
@@ -18,49 +26,119 @@ class EnvelopeDetector(BaseDetector):
         pass
 
     
-    def calc_envelope_of_signal(self, max_window=500,uniform_window=500):
-        analytic_signal = signal.hilbert(self.filtered_audio)
-        amplitude_envelope = np.abs(analytic_signal)
-        data = maximum_filter1d(amplitude_envelope, size=max_window)
-        data = uniform_filter1d(data,size=uniform_window)
+    def calc_envelope_of_signal(self, filtered_audio, max_window=500, uniform_window=500):
+        # the envelope is float32 in blocks unless the detector's dtype is float64,
+        # which transforms the audio at once to give the envelope of scipy.signal.hilbert
+        envelope_dtype = np.float32 if self.dtype is None else self.dtype
+        hilbert_block_size = None if np.dtype(envelope_dtype) == np.float64 else HILBERT_BLOCK_SIZE
+        with profile_stage('envelope', len(filtered_audio)):
+            amplitude_envelope = get_amplitude_envelope(filtered_audio, self.sample_rate, self.envelope_method, self.filter_cutoff_freq, envelope_dtype, hilbert_block_size)
+            data = maximum_filter1d(amplitude_envelope, size=self.get_scaled_length(max_window))
+            data = uniform_filter1d(data,size=self.get_scaled_length(uniform_window))
         return data
 
-    def get_envelope_threshold(self, lower_threshold=0.003, upper_threshold=0.02):
-        binary_array1 = (self.envelope_data > lower_threshold).astype(int)
-        binary_array2 = (self.envelope_data < upper_threshold).astype(int)
-        binary_array = binary_array1 + binary_array2
-        # binarray1 + binarray2 = 2 when in range
-        # binarray1 + binarray2 = 1 when spike
-        # binarray1 + binarray2 = 0 when nothing
-        for i in range(0,len(binary_array)):
-            if binary_array[i] == 1:
-                binary_array[i] = 0
+    def get_envelope_mask(self, envelope_data, lower_threshold=0.003, upper_threshold=0.02):
+        # True when the envelope is in range, False when it is a spike or nothing
+        return (envelope_data > lower_threshold) & (envelope_data < upper_threshold)
 
+    def get_envelope_threshold(self, envelope_data, lower_threshold=0.003, upper_threshold=0.02):
+        # 2 when in range, 0 when spike or nothing
+        binary_array = self.get_envelope_mask(envelope_data, lower_threshold, upper_threshold).view(np.uint8) * np.uint8(2)
         return binary_array
 
-    def detect_with_detector(self, filename, plot=False):
+    def detect_with_detector(self, filename, plot=False, retain=False):
         # the max interval between disyllabic in number of samples 
         # the min length of disyllabic in number of samples
-        self.filtered_audio = self.get_filtered_audio(filename)
-        self.envelope_data = self.calc_envelope_of_signal(500,500)
+        # the last file's arrays are dropped before this file's are made
+        self.release_signals()
+        if self.block_size is not None:
+            if plot or retain:
+                raise ValueError("Cannot plot or retain the signals when streaming, set block_size=None")
+            return self.detect_with_detector_streaming(filename)
+
+        filtered_audio = self.get_filtered_audio(filename)
+        envelope_data = self.calc_envelope_of_signal(filtered_audio, 500, 500)
         
-        if self.envelope_data.mean() < 0.0015:
+        if envelope_data.mean(dtype=np.float64) < 0.0015:
             lower_threshold = self.lower_faint
             upper_threshold = 0.02
         else:
             lower_threshold = self.lower_loud
             upper_threshold = 0.02
         
-        self.result = self.get_envelope_threshold(lower_threshold=lower_threshold, upper_threshold=upper_threshold)
-        
-        self.result = self.replace_small_zero_sequences()
-        self.result = self.replace_small_ones_sequences()
+        starts, ends = get_intervals_of_mask(self.get_envelope_mask(envelope_data, lower_threshold, upper_threshold))
+        self.set_intervals(starts, ends, len(envelope_data), get_run_peaks(envelope_data, starts, ends))
         
+        if plot or retain:
+            self.filtered_audio, self.envelope_data = filtered_audio, envelope_data
         if plot:
             self.plot_threshold(lower_threshold, upper_threshold)
+        return self.get_result()
+
+    def detect_with_detector_streaming(self, filename, max_window=500, uniform_window=500):
+        # each block is extended by the Hilbert context plus the reach of the two smoothing windows
+        context = HILBERT_CONTEXT + max_window + uniform_window
+        upper_threshold = 0.02
+        # the thresholds depend on the mean of the whole envelope,
+        # so track the detections for both and choose once the file is finished
+        faint_tracker = IntervalTracker()
+        loud_tracker = IntervalTracker()
+        envelope_sum = 0.0
+        for block_start, block_stop, filtered_audio, offset in self.get_filtered_audio_blocks(filename, context=(context, context)):
+            envelope_data = self.calc_envelope_of_signal(filtered_audio, max_window, uniform_window)
+            envelope_data = envelope_data[offset:offset + (block_stop - block_start)]
+            envelope_sum += np.sum(envelope_data, dtype=np.float64)
+            faint_tracker.update(self.get_envelope_mask(envelope_data, self.lower_faint, upper_threshold), envelope_data)
+            loud_tracker.update(self.get_envelope_mask(envelope_data, self.lower_loud, upper_threshold), envelope_data)
+
+        if envelope_sum / faint_tracker.length < 0.0015:
+            tracker = faint_tracker
+        else:
+            tracker = loud_tracker
+        self.set_intervals(*tracker.get_intervals(), tracker.length, tracker.get_run_peaks())
+        return self.get_result()
+
+    def get_threshold_params(self):
+        return {'lower_faint': self.lower_faint, 'lower_loud': self.lower_loud}
+
+    def get_params(self):
+        params = super().get_params()
+        params.update({'lower_faint': self.lower_faint, 'lower_loud': self.lower_loud, 'envelope_method': self.envelope_method})
+        return params
+
+    def get_runs_for_thresholds(self, path_to_file, thresholds, max_window=500, uniform_window=500):
+        upper_threshold = 0.02
+        # every lower threshold used by a faint or a loud file
+        lower_thresholds = {lower for key in thresholds for lower in key}
+
+        if self.block_size is None:
+            envelope_data = self.calc_envelope_of_signal(self.get_filtered_audio(path_to_file), max_window, uniform_window)
+            envelope_mean = envelope_data.mean(dtype=np.float64)
+            n_samples = len(envelope_data)
+            runs = {lower: get_intervals_of_mask(self.get_envelope_mask(envelope_data, lower, upper_threshold)) for lower in lower_thresholds}
+        else:
+            context = HILBERT_CONTEXT + max_window + uniform_window
+            trackers = {lower: IntervalTracker() for lower in lower_thresholds}
+            envelope_sum = 0.0
+            for block_start, block_stop, filtered_audio, offset in self.get_filtered_audio_blocks(path_to_file, context=(context, context)):
+                envelope_data = self.calc_envelope_of_signal(filtered_audio, max_window, uniform_window)
+                envelope_data = envelope_data[offset:offset + (block_stop - block_start)]
+                envelope_sum += np.sum(envelope_data, dtype=np.float64)
+                for lower, tracker in trackers.items():
+                    tracker.update(self.get_envelope_mask(envelope_data, lower, upper_threshold))
+            n_samples = next(iter(trackers.values())).length
+            envelope_mean = envelope_sum / n_samples
+            runs = {lower: tracker.get_intervals() for lower, tracker in trackers.items()}
+
+        # the same choice between the faint and loud threshold as detect_with_detector
+        faint = envelope_mean < 0.0015
+        return {(lower_faint, lower_loud): (*runs[lower_faint if faint else lower_loud], n_samples) for lower_faint, lower_loud in thresholds}
 
     def plot_threshold(self, lower_threshold, upper_threshold):
+        # matplotlib is only imported when plotting, so detection runs do not load it
+        import matplotlib.pyplot as plt
         # Plot the original audio, envelope, and binary array for visualization
+        self.result = self.get_result_labels()
         time = np.linspace(0, len(self.filtered_audio) / self.sample_rate, num=len(self.filtered_audio))
         plt.figure(figsize=(14, 6))
         plt.plot(time, self.filtered_audio, label='Original Audio')
@@ -0,0 +1,156 @@
+import os
+import time
+import numpy as np
+from utils.intervals import IntervalJoiner, get_selection_bounds
+from utils.filesystem.selectionwriter import SelectionWriter
+
+class FolderWatcher:
+    """
+    Detect katydids in the recordings of a deployment folder as they are synced into it.
+
+    The folder is scanned every poll_interval seconds (utils.filesystem.audiofiles.AudioFiles.scan_files),
+    and a recording is detected once it has not been modified for settle_time seconds, so files still being
+    copied are left until they are complete. Recordings are numbered in the order they are detected for
+    the deployment offsets, so they are expected to arrive in the order they were recorded.
+
+    The detector is kept between files, so its templates and filters are only prepared once.
+    Consecutive recordings of FILE_LENGTH seconds are treated as one continuous recording
+    (utils.intervals.IntervalJoiner), so a call across the end of a file is one selection, in the
+    file it begins in. A file's selections are written once none of them can be continued by the next
+    file. If no next file has arrived FILE_LENGTH + settle_time seconds after the last one was detected,
+    the recording is taken to have ended.
+
+    The selections are written to the detector's write_path, which is overwritten when run starts.
+    Nothing is kept between runs, so a watcher started again detects every recording already in the
+    folder again, from the first, so the offsets of the deployment start from the same recording.
+
+    Parameters
+    ----------
+    detector : detectors.BaseDetector
+        The detector, with the folder as its files' root_dir. Its files_list is replaced by the files detected.
+    poll_interval : float, default 10
+        Seconds between scans of the folder.
+    settle_time : float, default 30
+        Seconds a recording must be unmodified before it is detected.
+    """
+    def __init__(self, detector, poll_interval=10, settle_time=30) -> None:
+        self.detector = detector
+        self.files = detector.files
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.files.files_list = []
+        self.joiner = None
+        # (first sample in the recording, filenumber, number of samples) of each file of the current recording
+        self.recording_files = []
+        # starts and ends of the finished detections, in samples of the file they begin in, by filenumber
+        self.detections = {}
+        self.next_to_write = 0
+        self.last_detected_time = None
+        self.writer = None
+
+    def get_new_files(self):
+        """
+        Get the recordings that are complete and have not been detected, in the order they were recorded.
+        """
+        now = time.time()
+        detected = set(self.files.files_list)
+        new_files = []
+        for filename in self.files.scan_files():
+            if filename in detected:
+                continue
+            try:
+                modified_time = os.stat(f"{self.files.root_dir}/{filename}").st_mtime
+            except FileNotFoundError:
+                continue
+            if now - modified_time < self.settle_time:
+                # still being copied, and the recordings after it have to wait for it
+                break
+            new_files.append(filename)
+        return new_files
+
+    def detect_file(self, filename):
+        filenumber = len(self.files.files_list)
+        self.last_detected_time = time.time()
+        thresholds = tuple(self.detector.get_threshold_params().values())
+        try:
+            print(f"Starting .... {filename}")
+            starts, ends, n_samples = self.detector.get_runs_for_thresholds(f"{self.files.root_dir}/{filename}", [thresholds])[thresholds]
+        except FileNotFoundError:
+            print(f"File ({filename}) does not exist ... Skipping......")
+            self.end_recording()
+            if self.files.index is None:
+                # its place on the FILE_LENGTH grid is kept, with an index the offsets come from the recordings that exist
+                self.files.files_list.append(filename)
+            return
+
+        # a file continues the recording if it follows a whole file
+        if self.recording_files:
+            _, previous_filenumber, previous_samples = self.recording_files[-1]
+            if previous_filenumber != filenumber - 1 or previous_samples != round(self.files.FILE_LENGTH * self.detector.sample_rate):
+                self.end_recording()
+        self.files.files_list.append(filename)
+        if self.joiner is None:
+            self.joiner = IntervalJoiner(self.detector.get_scaled_length(self.detector.max_interval_len),
+                                         self.detector.get_scaled_length(self.detector.min_disyllabic_len))
+        self.recording_files.append((self.joiner.length, filenumber, n_samples))
+        self.add_detections(*self.joiner.update(starts, ends, n_samples))
+        self.write_finished()
+
+    def add_detections(self, starts, ends):
+        first_samples = np.array([first_sample for first_sample, _, _ in self.recording_files])
+        begin_files = np.searchsorted(first_samples, starts, side='right') - 1
+        for begin_file, start, end in zip(begin_files, starts, ends):
+            first_sample, filenumber, _ = self.recording_files[begin_file]
+            self.detections.setdefault(filenumber, []).append((start - first_sample, end - first_sample))
+
+    def end_recording(self):
+        """
+        Finish the detections of the current recording and write them.
+        """
+        if self.joiner is not None:
+            starts, ends = self.joiner.finish()
+            self.add_detections(*get_selection_bounds(starts, ends, self.joiner.length))
+            self.joiner = None
+        self.recording_files = []
+        self.write_finished()
+
+    def write_finished(self):
+        # the files before the one the open detection begins in are finished
+        if self.joiner is not None and self.joiner.open_run is not None:
+            first_samples = [first_sample for first_sample, _, _ in self.recording_files]
+            open_file = np.searchsorted(first_samples, self.joiner.open_run[0], side='right') - 1
+            finished_files = self.recording_files[open_file][1]
+        else:
+            finished_files = len(self.files.files_list)
+
+        for filenumber in range(self.next_to_write, finished_files):
+            detections = self.detections.pop(filenumber, None)
+            if detections is None:
+                continue
+            starts, ends = (np.array(samples) for samples in zip(*detections))
+            filename = self.files.files_list[filenumber]
+            selections = self.detector.get_selections_of_samples(starts, ends, filename)
+            self.writer.write(self.detector.offset_to_deployment(selections, filenumber))
+        self.next_to_write = max(self.next_to_write, finished_files)
+
+    def run(self, max_idle_polls=None):
+        """
+        Watch the folder until max_idle_polls scans in a row find no new recordings, or forever if None.
+        The recording is ended and its selections written when watching stops, including on KeyboardInterrupt.
+        The detector's write_path is overwritten, with the selections of every recording detected by this run.
+        """
+        with SelectionWriter(self.detector.write_path) as self.writer:
+            idle_polls = 0
+            try:
+                while True:
+                    new_files = self.get_new_files()
+                    for filename in new_files:
+                        self.detect_file(filename)
+                    idle_polls = 0 if new_files else idle_polls + 1
+                    if self.joiner is not None and time.time() - self.last_detected_time > self.files.FILE_LENGTH + self.settle_time:
+                        self.end_recording()
+                    if max_idle_polls is not None and idle_polls >= max_idle_polls:
+                        break
+                    time.sleep(self.poll_interval)
+            finally:
+                self.end_recording()
@@ -1,8 +1,10 @@
-from utils.filesystem import selectionfiles, audiofiles
-from utils import score
-from detectors import envelope, correlate
+from utils.filesystem import audiofiles
+from utils.filesystem.deploymentindex import DeploymentIndex
+from utils.cache import FilteredAudioCache, SelectionTableCache
+from utils.profiling import StageProfiler, JsonLinesLog
+from detectors import envelope, correlate, bandenergy, cascade
 
-def get_detections(model_name, months, days,extra, site='06',dep='001'):
+def get_detections(model_name, months, days,extra, site='06',dep='001', n_workers=1, block_size=None, cache=None, band=None, resume=False, profile_path=None, index=None):
     '''
     Get the katydid detection using a given analytical detector
 
@@ -21,31 +23,62 @@ def get_detections(model_name, months, days,extra, site='06',dep='001'):
         The site number. Used for accessing the correct audio file.
     dep : string
         The deployment number. Used for accessing the correct audio file.
+    n_workers : int or None, default 1
+        The number of processes to run the detector in. None uses one per CPU.
+    block_size : int or None, default None
+        Stream each file through the detector in blocks of this many samples. None loads each file whole.
+    cache : utils.cache.FilteredAudioCache or None, default None
+        Cache of filtered audio to share between detectors and runs. None filters every file each run.
+    band : tuple(int, int) or None, default None
+        Detect in this (low, high) band in Hz, shifted to baseband and decimated. None detects at the full sample rate.
+    resume : bool, default False
+        Reuse the files finished by an earlier run with the same parameters, e.g. one that was interrupted.
+    profile_path : string or None, default None
+        Append the time and memory of each stage of each file to this JSON lines file and print a summary. None does not profile.
+    index : utils.filesystem.deploymentindex.DeploymentIndex or None, default None
+        Index of the deployment's recordings, to skip missing files and offset by the real file lengths. None assumes every file is 600 s.
 
     '''
 
-    # detector = correlate or envelope
+    # detector = correlate, envelope, bandenergy or cascade
     write_file = f"Brachyphisis_Signal_Detectors/Data/Site{site}_Deployment{dep}_selections_{model_name}.txt"
     
     # get the audio files from the site and deployment
     rootdir = f"Brachyphisis_Signal_Detectors/Data/site{site}/deployment_{dep}"
-    audio_files = audiofiles.AudioFiles(rootdir,months,days,hours=None,year='2023',extra=extra, site=site, dep=dep)
+    audio_files = audiofiles.AudioFiles(rootdir,months,days,hours=None,year='2023',extra=extra, site=site, dep=dep, index=index)
     
     if model_name == 'envelope':
         # initialise envelope detector with Butterworth high-pass filter of 17 kHz
-        detector = envelope.EnvelopeDetector(audio_files,filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,lower_faint=0.002,lower_loud=0.003, write_path=write_file)
+        detector = envelope.EnvelopeDetector(audio_files,filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,lower_faint=0.002,lower_loud=0.003, write_path=write_file, block_size=block_size, cache=cache, band=band)
+    elif model_name == 'bandenergy':
+        if band is not None:
+            raise ValueError("The band energy detector works on STFT frames of the filtered audio, set band=None")
+        # initialise band energy detector with Butterworth high-pass filter of 17 kHz
+        # detect when the 11-37 kHz band has 4 times the power of the band above it
+        detector = bandenergy.BandEnergyDetector(audio_files,filter_cutoff_freq=17000,max_interval_length=10000,min_disyllabic_len=5000,threshold=4.0, write_path=write_file, block_size=block_size, cache=cache)
+    elif model_name == 'cascade':
+        if band is not None or block_size is not None:
+            raise ValueError("The cascade detector correlates regions of whole files at the full sample rate, set band=None and block_size=None")
+        template_name = "Brachyphisis_Signal_Detectors/Data/site06/deployment_001/6_20230327_053000.wav"
+        # the same correlation detector, only correlating the regions where the band energy pre-screen finds candidates
+        correlate_detector = correlate.CorrelateDetector(audio_files,template_name,template_end_time=0.225,filter_cutoff_freq=17000,max_interval_length=12000,min_disyllabic_len=5000, cache=cache)
+        detector = cascade.CascadeDetector(correlate_detector, write_path=write_file)
     else:
         # correlation detector
         template_name = "Brachyphisis_Signal_Detectors/Data/site06/deployment_001/6_20230327_053000.wav"
         # initialise correlation detector with Butterworth high-pass filter of 17 kHz
         # use template_name as the template of the katydid signal to correlate audio to
-        detector = correlate.CorrelateDetector(audio_files,template_name,template_end_time=0.225,filter_cutoff_freq=17000,max_interval_length=12000,min_disyllabic_len=5000, write_path=write_file)
+        detector = correlate.CorrelateDetector(audio_files,template_name,template_end_time=0.225,filter_cutoff_freq=17000,max_interval_length=12000,min_disyllabic_len=5000, write_path=write_file, block_size=block_size, cache=cache, band=band)
     
     # detect katydid and output detections to write_file
-    detector.detect()
+    if profile_path is None:
+        detector.detect(n_workers=n_workers, resume=resume)
+    else:
+        with JsonLinesLog(profile_path) as profile_log:
+            detector.detect(n_workers=n_workers, resume=resume, profiler=StageProfiler([profile_log]))
 
 
-def get_scores_and_cm_detect(model_name, months, days, extra):
+def get_scores_and_cm_detect(model_name, months, days, extra, cache=None, index=None):
     '''
     Calculate precision and recall scores and confusion matrix for a given analytical detector
 
@@ -60,25 +93,39 @@ def get_scores_and_cm_detect(model_name, months, days, extra):
     extra : dict or None
         If there are any extra selections to add to the array that do not involve all the hours in standard recorded hours.
         Must include months, days, and hours.
+    cache : utils.cache.SelectionTableCache or None, default None
+        Cache of parsed selection tables, so unchanged annotations are not parsed again. None parses every table each run.
+    index : utils.filesystem.deploymentindex.DeploymentIndex or None, default None
+        Index of the deployment's recordings, for the real length of the deployment. None assumes every file is 600 s.
 
     '''
-    # detector = correlate or envelope
+    # scoring needs pandas, so it is only imported for scoring runs
+    from utils.filesystem import selectionfiles
+    from utils import score
+
+    # detector = correlate, envelope, bandenergy or cascade
     if model_name == 'correlate':
         rootdir = f"Brachyphisis_Signal_Detectors/Data"
         detector_file = f"Site06_Deployment001_selections_{model_name}.txt"
     elif model_name == "envelope":
         rootdir = f"Brachyphisis_Signal_Detectors/Data"
         detector_file = f"Site06_Deployment001_selections_{model_name}.txt"
+    elif model_name == "bandenergy":
+        rootdir = f"Brachyphisis_Signal_Detectors/Data"
+        detector_file = f"Site06_Deployment001_selections_{model_name}.txt"
+    elif model_name == "cascade":
+        rootdir = f"Brachyphisis_Signal_Detectors/Data"
+        detector_file = f"Site06_Deployment001_selections_{model_name}.txt"
     else:
-        raise ValueError("Did not specify correlate or envelope")
+        raise ValueError("Did not specify correlate, envelope, bandenergy or cascade")
 
     # get the files containing the annotations of katydids made by the analytical detector
-    selections = selectionfiles.ManualFiles(rootdir,months,days,hours=None,year='2023',extra=extra, site='06', dep='001',manual_file_path=detector_file)
+    selections = selectionfiles.ManualFiles(rootdir,months,days,hours=None,year='2023',extra=extra, site='06', dep='001',manual_file_path=detector_file, cache=cache, index=index)
 
     # get the files containing the annotations of katydids manually made by researcher using RavenPro
     manual_filepath = "manual_selection_dep001.txt"
     manual_root = "Brachyphisis_Signal_Detectors/Data"
-    manual_selections = selectionfiles.ManualFiles(manual_root,months,days,hours=None,year='2023',extra=extra, site='06', dep='001',manual_file_path=manual_filepath)
+    manual_selections = selectionfiles.ManualFiles(manual_root,months,days,hours=None,year='2023',extra=extra, site='06', dep='001',manual_file_path=manual_filepath, cache=cache, index=index)
 
     segment_length = 1 # second length segments to split file into
     write_file = f"Brachyphisis_Signal_Detectors/Data/SCORE{segment_length}_Site06_Deployment001_{model_name}"
@@ -93,19 +140,41 @@ def run():
     days=[]
     extra = {'months': ['03'], 'days':['16','17','18'], 'hours':['000000','050000','053000'], 'year':'2023'}
 
+    # the detectors all use the same 17 kHz filtered audio, so filter each file once
+    cache = FilteredAudioCache("Brachyphisis_Signal_Detectors/Data/filtered_audio_cache")
+    # the recordings that exist and their real lengths, for the deployment offsets
+    index = DeploymentIndex("Brachyphisis_Signal_Detectors/Data/site06/deployment_001")
+
     # run correlate detector on files
     print("Running Correlation Detector")
-    get_detections('correlate',months,days,extra,site='06',dep='001')
+    get_detections('correlate',months,days,extra,site='06',dep='001',cache=cache,resume=True,index=index)
     
     # run envelope detector on files
     print("Running Envelope Detector")
-    get_detections('envelope',months,days,extra,site='06',dep='001')
+    get_detections('envelope',months,days,extra,site='06',dep='001',cache=cache,resume=True,index=index)
+
+    # run band energy detector on files
+    print("Running Band Energy Detector")
+    get_detections('bandenergy',months,days,extra,site='06',dep='001',cache=cache,resume=True,index=index)
+
+    # run cascade detector on files
+    print("Running Cascade Detector")
+    get_detections('cascade',months,days,extra,site='06',dep='001',cache=cache,resume=True,index=index)
+
+    # the manual annotations are the same for every detector, so parse them once
+    selection_cache = SelectionTableCache("Brachyphisis_Signal_Detectors/Data/selection_cache")
 
     # score correlate
-    get_scores_and_cm_detect('correlate',months,days,extra)
+    get_scores_and_cm_detect('correlate',months,days,extra,cache=selection_cache,index=index)
 
     # score envelope
-    get_scores_and_cm_detect('envelope',months,days,extra)
+    get_scores_and_cm_detect('envelope',months,days,extra,cache=selection_cache,index=index)
+
+    # score band energy
+    get_scores_and_cm_detect('bandenergy',months,days,extra,cache=selection_cache,index=index)
+
+    # score cascade
+    get_scores_and_cm_detect('cascade',months,days,extra,cache=selection_cache,index=index)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules are imported from the root of the repository, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_RATE = 96000
+
+
+def get_call(rng):
+    # two syllables of a 25 kHz tone, as the katydid's disyllabic call
+    times = np.arange(int(0.03 * SAMPLE_RATE)) / SAMPLE_RATE
+    syllable = np.sin(2 * np.pi * 25000 * times) * np.hanning(len(times))
+    gap = np.zeros(int(0.02 * SAMPLE_RATE))
+    return 0.2 * rng.uniform(0.5, 1) * np.concatenate((syllable, gap, syllable))
+
+
+def write_recording(path, duration, call_times, seed=0):
+    from scipy.io import wavfile
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.002, int(duration * SAMPLE_RATE))
+    for call_time in call_times:
+        call = get_call(rng)
+        start = int(call_time * SAMPLE_RATE)
+        audio[start:start + len(call)] += call[:len(audio) - start]
+    wavfile.write(path, SAMPLE_RATE, (audio * 2**15).astype(np.int16))
+
+
+@pytest.fixture
+def deployment(tmp_path):
+    """
+    A folder of three 4 second recordings with calls, named as AudioFiles expects, and a template file
+    with one call from 0.062 to 0.144 seconds.
+
+    Returns the folder and the path of the template.
+    """
+    root_dir = str(tmp_path / "deployment")
+    os.makedirs(root_dir)
+    template_path = str(tmp_path / "template.wav")
+    write_recording(template_path, 1, [0.062])
+    for seed, hour in enumerate(['000000', '050000', '053000']):
+        write_recording(f"{root_dir}/6_20230316_{hour}.wav", 4, [0.5 + seed, 2.1, 3.3 - 0.4 * seed], seed + 1)
+    return root_dir, template_path
@@ -0,0 +1,78 @@
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from utils.audio_processing import WavFile, DecodedAudio, open_audio, read_audio
+
+SAMPLE_RATE = 96000
+N_SAMPLES = 5001
+
+# (soundfile format, subtype)
+WAV_FORMATS = [
+    ('WAV', 'PCM_U8'),
+    ('WAV', 'PCM_16'),
+    ('WAV', 'PCM_24'),
+    ('WAV', 'PCM_32'),
+    ('WAV', 'FLOAT'),
+    ('WAV', 'DOUBLE'),
+    # the extensible header, with the sample format in its sub-format GUID
+    ('WAVEX', 'PCM_16'),
+    ('WAVEX', 'PCM_24'),
+    ('WAVEX', 'FLOAT'),
+]
+
+
+def write_audio(path, n_channels, file_format, subtype):
+    rng = np.random.default_rng(n_channels)
+    audio = np.clip(rng.normal(0, 0.3, (N_SAMPLES, n_channels)), -1, 0.999)
+    sf.write(path, audio, SAMPLE_RATE, format=file_format, subtype=subtype)
+
+
+@pytest.mark.parametrize('n_channels', [1, 2])
+@pytest.mark.parametrize('file_format, subtype', WAV_FORMATS)
+def test_wav_matches_librosa(tmp_path, file_format, subtype, n_channels):
+    path = str(tmp_path / 'audio.wav')
+    write_audio(path, n_channels, file_format, subtype)
+    reference, reference_rate = librosa.load(path, sr=None)
+
+    audio = open_audio(path)
+    assert isinstance(audio, WavFile)
+    assert audio.sample_rate == reference_rate
+    assert audio.frames == len(reference)
+    audio_data, sample_rate = read_audio(path)
+    assert audio_data.dtype == np.float32
+    np.testing.assert_allclose(audio_data, reference, rtol=0, atol=1e-7)
+    # ranges, including past the end of the file
+    for start, stop in [(0, 1), (123, 4567), (4000, None), (N_SAMPLES - 10, N_SAMPLES + 10), (N_SAMPLES, None)]:
+        np.testing.assert_array_equal(audio.read(start, stop), audio_data[start:stop])
+
+
+def test_wav_with_extra_chunks(tmp_path):
+    path = str(tmp_path / 'audio.wav')
+    write_audio(path, 1, 'WAV', 'PCM_16')
+    with open(path, 'rb') as file:
+        riff = file.read()
+    # an odd-sized chunk, padded to an even length, between the fmt and data chunks
+    fmt_end = 12 + 8 + int.from_bytes(riff[16:20], 'little')
+    extra_chunk = b'LIST' + (3).to_bytes(4, 'little') + b'abc' + b'\0'
+    riff = riff[:fmt_end] + extra_chunk + riff[fmt_end:]
+    riff = riff[:4] + (len(riff) - 8).to_bytes(4, 'little') + riff[8:]
+    with open(path, 'wb') as file:
+        file.write(riff)
+    np.testing.assert_allclose(read_audio(path)[0], librosa.load(path, sr=None)[0], rtol=0, atol=1e-7)
+
+
+def test_other_formats_are_decoded(tmp_path):
+    path = str(tmp_path / 'audio.flac')
+    write_audio(path, 2, 'FLAC', 'PCM_16')
+    audio = open_audio(path)
+    assert isinstance(audio, DecodedAudio)
+    reference, _ = librosa.load(path, sr=None)
+    np.testing.assert_allclose(audio.read(), reference, rtol=0, atol=1e-7)
+    np.testing.assert_allclose(audio.read(100, 200), reference[100:200], rtol=0, atol=1e-7)
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_audio(str(tmp_path / 'missing.wav'))
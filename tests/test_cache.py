@@ -0,0 +1,39 @@
+import os
+import numpy as np
+from scipy.io import wavfile
+
+from utils.audio_processing import get_filtered_audio_from_file
+from utils.cache import FilteredAudioCache
+
+
+def write_noise(path, n_samples=48000, sample_rate=96000):
+    rng = np.random.default_rng(0)
+    wavfile.write(path, sample_rate, (rng.normal(0, 3000, n_samples)).astype(np.int16))
+
+
+def test_cache_stores_each_precision(tmp_path):
+    audio_path = str(tmp_path / "noise.wav")
+    write_noise(audio_path)
+    cache = FilteredAudioCache(str(tmp_path / "cache"))
+    reference, _, sample_rate = get_filtered_audio_from_file(audio_path, 17000)
+
+    filtered64, cached_rate = cache.get_filtered_audio(audio_path, 17000, dtype=np.float64)
+    filtered32, _ = cache.get_filtered_audio(audio_path, 17000)
+    assert cached_rate == sample_rate
+    assert filtered64.dtype == np.float64 and filtered32.dtype == np.float32
+    np.testing.assert_array_equal(filtered64, reference)
+    np.testing.assert_array_equal(filtered32, reference.astype(np.float32))
+    # a second read is served from the cache
+    np.testing.assert_array_equal(cache.get_filtered_audio(audio_path, 17000, dtype=np.float64)[0], reference)
+
+
+def test_evict_leaves_entries_being_written(tmp_path):
+    audio_path = str(tmp_path / "noise.wav")
+    write_noise(audio_path)
+    cache = FilteredAudioCache(str(tmp_path / "cache"), max_bytes=0)
+    # another process's entry part way through being written
+    tmp_entry = tmp_path / "cache" / "0123.npy.99999.tmp"
+    tmp_entry.write_bytes(b"\0" * 1000)
+    cache.get_filtered_audio(audio_path, 17000)
+    assert tmp_entry.exists()
+    assert not any(name.endswith(".npy") for name in os.listdir(tmp_path / "cache"))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from scipy.signal import correlate
+from utils.correlation import TemplateCorrelator, TemplateBankCorrelator
+
+
+def reference_correlation(audio, template):
+    # the correlation of the original CorrelateDetector.normalisedCorrelate, before normalising
+    return correlate(audio, template, mode='full')[len(template) - 1:]
+
+
+@pytest.mark.parametrize("n_samples, template_len", [(1, 7), (500, 7), (100000, 2000), (123457, 9409)])
+def test_template_correlator_matches_scipy(n_samples, template_len):
+    rng = np.random.default_rng(n_samples)
+    audio = rng.normal(size=n_samples)
+    template = rng.normal(size=template_len)
+    expected = reference_correlation(audio, template)
+    correlation = TemplateCorrelator(template).correlate(audio)
+    np.testing.assert_allclose(correlation, expected, rtol=0, atol=1e-9 * np.max(np.abs(expected)))
+
+
+def test_template_correlator_lags_past_the_audio():
+    rng = np.random.default_rng(0)
+    audio = rng.normal(size=30000)
+    template = rng.normal(size=1000)
+    correlator = TemplateCorrelator(template)
+    # a block that stops short of the lags it reaches is zero-padded, as at the end of the file
+    expected = reference_correlation(np.concatenate((audio, np.zeros(5000))), template)[:32000]
+    np.testing.assert_allclose(correlator.correlate(audio, n_lags=32000), expected, atol=1e-9 * np.max(np.abs(expected)))
+
+
+def test_template_correlator_float32():
+    rng = np.random.default_rng(1)
+    audio = rng.normal(size=200000)
+    template = rng.normal(size=3000)
+    expected = reference_correlation(audio, template)
+    correlation = TemplateCorrelator(template, np.float32).correlate(audio.astype(np.float32))
+    assert correlation.dtype == np.float32
+    np.testing.assert_allclose(correlation, expected, rtol=0, atol=1e-5 * np.max(np.abs(expected)))
+
+
+def test_template_bank_correlator_matches_scipy():
+    rng = np.random.default_rng(2)
+    audio = rng.normal(size=150001)
+    templates = [rng.normal(size=2000), rng.normal(size=1500)]
+    norm_factors = [40.0, 25.0]
+    expected = np.max([np.abs(reference_correlation(audio, template)) / norm_factor for template, norm_factor in zip(templates, norm_factors)], axis=0)
+    score = TemplateBankCorrelator(templates, norm_factors).correlate(audio)
+    np.testing.assert_allclose(score, expected, rtol=0, atol=1e-9 * np.max(expected))
+
+
+def test_single_template_bank_matches_original_detections():
+    # the original detector thresholded abs(correlation) / norm_factor
+    rng = np.random.default_rng(3)
+    template = rng.normal(size=800)
+    audio = rng.normal(0, 0.1, size=60000)
+    for start in (5000, 30000, 51000):
+        audio[start:start + 800] += template
+    norm_factor = np.max(reference_correlation(audio, template))
+    expected = np.abs(reference_correlation(audio, template) / norm_factor) > 0.3
+    score = TemplateBankCorrelator([template], [norm_factor]).correlate(audio)
+    np.testing.assert_array_equal(score > 0.3, expected)
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+from detectors.correlate import CorrelateDetector
+from detectors.watch import FolderWatcher
+from utils.filesystem.audiofiles import AudioFiles
+from utils.filesystem.deploymentindex import DeploymentIndex
+
+HOURS = ['000000', '050000', '053000']
+
+
+def test_recordings_after_the_scan_are_read(deployment, tmp_path):
+    root_dir, _ = deployment
+    late_path = f"{root_dir}/6_20230316_053000.wav"
+    os.rename(late_path, tmp_path / "late.wav")
+    index = DeploymentIndex(root_dir, str(tmp_path / "index.json"))
+    assert len(index) == 2
+    os.rename(tmp_path / "late.wav", late_path)
+
+    files_list = [f"6_20230316_{hour}.wav" for hour in HOURS] + ["6_20230316_060000.wav"]
+    # the last file's duration is not needed for the offsets
+    np.testing.assert_allclose(index.get_offsets(files_list), [0, 4, 8, 12])
+    assert "6_20230316_053000.wav" in index
+    assert "6_20230316_053000" in DeploymentIndex.load(index)
+    with pytest.raises(FileNotFoundError):
+        index.get_durations(files_list)
+    np.testing.assert_allclose(index.get_durations(files_list, missing_ok=True), [4, 4, 4, 0])
+
+
+def test_watcher_offsets_of_new_recordings(deployment, tmp_path):
+    root_dir, template_path = deployment
+    index = DeploymentIndex(root_dir, str(tmp_path / "index.json"))
+    # the recordings arrive after the index is made
+    late_path = f"{root_dir}/6_20230316_060000.wav"
+    with open(f"{root_dir}/6_20230316_053000.wav", "rb") as file:
+        audio = file.read()
+    with open(late_path, "wb") as file:
+        file.write(audio)
+
+    files = AudioFiles(root_dir, ['03'], ['16'], hours=HOURS, index=index)
+    detector = CorrelateDetector(files, template_path, threshold=0.3, write_path=str(tmp_path / "watch.txt"))
+    FolderWatcher(detector, poll_interval=0, settle_time=0).run(max_idle_polls=1)
+    assert files.files_list[-1] == "6_20230316_060000.wav"
+    np.testing.assert_allclose(files.get_offsets(), [0, 4, 8, 12])
@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+from detectors.correlate import CorrelateDetector
+from detectors.watch import FolderWatcher
+from utils.filesystem.audiofiles import AudioFiles
+
+HOURS = ['000000', '050000', '053000']
+
+
+def get_files(root_dir, **kwargs):
+    return AudioFiles(root_dir, ['03'], ['16'], hours=HOURS, **kwargs)
+
+
+def read_times(path):
+    return pd.read_csv(path, sep='\t')[['Begin Time (s)', 'End Time (s)']]
+
+
+def test_bank_thresholds_per_template(deployment):
+    root_dir, template_path = deployment
+    detector = CorrelateDetector(get_files(root_dir), [template_path, template_path], [0.062, 0.062], [0.144, 0.144],
+                                 threshold=[0.3, 0.35], combine='any')
+    assert os.path.basename(detector.write_path) == 'Site06_Deployment001_sel_17000Hz_0.3-0.35threshold_12000interval_5000disyllabic.txt'
+    detector.detect()
+    selections = read_times(detector.write_path)
+    assert len(selections) > 0
+
+    results = detector.sweep({'threshold': [[0.3, 0.35], [0.5, 0.5]]})
+    assert [params['threshold'] for params, _ in results] == [(0.3, 0.35), (0.5, 0.5)]
+    pd.testing.assert_frame_equal(results[0][1][['Begin Time (s)', 'End Time (s)']].reset_index(drop=True), selections)
+    write_paths = detector.write_sweep(results, f"{root_dir}/sweep")
+    assert os.path.basename(write_paths[0]).endswith('_0.3-0.35threshold.txt')
+
+    watch_path = f"{root_dir}/watch.txt"
+    watched = CorrelateDetector(get_files(root_dir), [template_path, template_path], [0.062, 0.062], [0.144, 0.144],
+                                threshold=[0.3, 0.35], combine='any', write_path=watch_path)
+    FolderWatcher(watched, poll_interval=0, settle_time=0).run(max_idle_polls=1)
+    assert len(read_times(watch_path)) == len(selections)
+
+
+def test_resume_writes_the_same_selections(deployment):
+    root_dir, template_path = deployment
+    detector = CorrelateDetector(get_files(root_dir), template_path, threshold=0.3)
+    detector.detect()
+    with open(detector.write_path) as file:
+        selections = file.read()
+    # drop the last file's line, as if the run was interrupted before it finished
+    manifest_path = f"{detector.write_path}.manifest.jsonl"
+    with open(manifest_path) as file:
+        lines = file.readlines()
+    with open(manifest_path, "w") as file:
+        file.writelines(lines[:-1])
+
+    detector.detect(resume=True)
+    with open(detector.write_path) as file:
+        assert file.read() == selections
+
+
+def test_cascade_filters_only_its_regions(deployment, tmp_path):
+    from detectors.cascade import CascadeDetector
+    from utils.cache import FilteredAudioCache
+    root_dir, template_path = deployment
+    full = CorrelateDetector(get_files(root_dir), template_path, threshold=0.3, write_path=str(tmp_path / "full.txt"))
+    full.detect()
+    cache_dir = str(tmp_path / "cache")
+    correlate_detector = CorrelateDetector(get_files(root_dir), template_path, threshold=0.3, cache=FilteredAudioCache(cache_dir))
+    cached_files = set(os.listdir(cache_dir))
+    cascade = CascadeDetector(correlate_detector, write_path=str(tmp_path / "cascade.txt"))
+    cascade.detect()
+    pd.testing.assert_frame_equal(read_times(cascade.write_path), read_times(full.write_path))
+    # the recordings are not filtered whole to fill the cache
+    assert set(os.listdir(cache_dir)) == cached_files
+
+    report = cascade.measure_recall_loss()
+    assert list(report['recalled']) == list(report['full_detections'])
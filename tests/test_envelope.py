@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from scipy.signal import hilbert
+
+from utils.audio_processing import highpass_filter
+from utils.envelope import hilbert_envelope, HILBERT_CONTEXT
+
+SAMPLE_RATE = 96000
+
+
+def filtered_noise(n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    return highpass_filter(rng.normal(0, 0.01, n_samples), 17000, SAMPLE_RATE)
+
+
+@pytest.mark.parametrize('n_samples', [4801, 96001, 100003])
+def test_exact_envelope_matches_scipy(n_samples):
+    audio = filtered_noise(n_samples)
+    reference = np.abs(hilbert(audio))
+    np.testing.assert_allclose(hilbert_envelope(audio, np.float64, block_size=None), reference, rtol=0, atol=1e-12 * np.max(reference))
+    np.testing.assert_allclose(hilbert_envelope(audio, np.float32, block_size=None), reference, rtol=0, atol=1e-5 * np.max(reference))
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_blocked_envelope_error_bound(dtype):
+    # several blocks, with the last one short
+    block_size = 2**16
+    audio = filtered_noise(5 * block_size + 12345)
+    rms = np.sqrt(np.mean(audio**2))
+    error = np.abs(hilbert_envelope(audio, dtype, block_size=block_size) - np.abs(hilbert(audio)))
+    interior = slice(HILBERT_CONTEXT, len(audio) - HILBERT_CONTEXT)
+    assert np.max(error[interior]) < 0.02 * rms
+    assert np.median(error) < 0.002 * rms
+    assert np.max(error) < 0.6 * rms
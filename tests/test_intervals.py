@@ -0,0 +1,127 @@
+import numpy as np
+from utils.intervals import (get_intervals_of_mask, fill_small_gaps, remove_short_intervals, get_mask_of_intervals,
+                             get_selection_bounds, get_run_peaks, get_interval_peaks, IntervalTracker, IntervalJoiner)
+
+
+# the per-sample label processing of the original BaseDetector, which the intervals replace
+
+def reference_segments_of_labels(result, ones=True):
+    if ones:
+        s_val, e_val, val = 2, -2, 2
+    else:
+        s_val, e_val, val = -2, 2, 0
+    diffs = np.diff(result)
+    starts = np.where(diffs == s_val)[0] + 1
+    ends = np.where(diffs == e_val)[0] + 1
+    if result[0] == val:
+        starts = np.insert(starts, 0, 0)
+    if result[-1] == val:
+        ends = np.append(ends, len(result) - 1)
+    return starts, ends
+
+
+def reference_detections(mask, max_interval_len, min_disyllabic_len):
+    result = mask.astype(int) * 2
+    for start, end in zip(*reference_segments_of_labels(result, ones=False)):
+        if (end - start) < max_interval_len:
+            result[start:end] = 2
+    for start, end in zip(*reference_segments_of_labels(result, ones=True)):
+        if (end - start) < min_disyllabic_len:
+            result[start:end] = 0
+    return result, reference_segments_of_labels(result, ones=True)
+
+
+def random_mask(rng):
+    n_samples = int(rng.integers(2, 400))
+    # runs and gaps of random lengths, so short and long ones are both common
+    lengths = rng.integers(1, 40, size=n_samples)
+    values = np.arange(len(lengths)) % 2 == rng.integers(0, 2)
+    return np.repeat(values, lengths)[:n_samples]
+
+
+def test_intervals_match_per_sample_labels():
+    rng = np.random.default_rng(0)
+    for _ in range(20000):
+        mask = random_mask(rng)
+        max_gap, min_len = int(rng.integers(1, 30)), int(rng.integers(1, 30))
+        expected_result, (expected_starts, expected_ends) = reference_detections(mask, max_gap, min_len)
+
+        starts, ends = fill_small_gaps(*get_intervals_of_mask(mask), len(mask), max_gap)
+        starts, ends = remove_short_intervals(starts, ends, len(mask), min_len)
+        np.testing.assert_array_equal(get_mask_of_intervals(starts, ends, len(mask)), expected_result == 2)
+        selection_starts, selection_ends = get_selection_bounds(starts, ends, len(mask))
+        np.testing.assert_array_equal(selection_starts, expected_starts)
+        np.testing.assert_array_equal(selection_ends, expected_ends)
+
+
+def test_tracker_matches_whole_mask():
+    rng = np.random.default_rng(1)
+    for _ in range(2000):
+        mask = random_mask(rng)
+        tracker = IntervalTracker()
+        position = 0
+        while position < len(mask):
+            block_size = int(rng.integers(1, 50))
+            tracker.update(mask[position:position + block_size])
+            position += block_size
+        starts, ends = get_intervals_of_mask(mask)
+        tracked_starts, tracked_ends = tracker.get_intervals()
+        np.testing.assert_array_equal(tracked_starts, starts)
+        np.testing.assert_array_equal(tracked_ends, ends)
+
+
+
+def test_joiner_matches_whole_recording():
+    rng = np.random.default_rng(2)
+    for _ in range(5000):
+        mask = random_mask(rng)
+        max_gap, min_len = int(rng.integers(1, 30)), int(rng.integers(1, 30))
+        joiner = IntervalJoiner(max_gap, min_len)
+        joined_starts, joined_ends = [], []
+        position = 0
+        while position < len(mask):
+            file_mask = mask[position:position + int(rng.integers(1, 80))]
+            starts, ends = joiner.update(*get_intervals_of_mask(file_mask), len(file_mask))
+            joined_starts.append(starts)
+            joined_ends.append(ends)
+            position += len(file_mask)
+        starts, ends = joiner.finish()
+        joined_starts.append(starts)
+        joined_ends.append(ends)
+
+        starts, ends = fill_small_gaps(*get_intervals_of_mask(mask), len(mask), max_gap)
+        starts, ends = remove_short_intervals(starts, ends, len(mask), min_len)
+        np.testing.assert_array_equal(np.concatenate(joined_starts), starts)
+        np.testing.assert_array_equal(np.concatenate(joined_ends), ends)
+
+
+def reference_interval_peaks(signal, run_starts, run_ends, starts, ends):
+    peaks = []
+    for start, end in zip(starts, ends):
+        run_peaks = [np.max(signal[run_start:run_end]) for run_start, run_end in zip(run_starts, run_ends) if start <= run_start < end]
+        peaks.append(max(run_peaks) if run_peaks else np.nan)
+    return np.array(peaks)
+
+
+def test_peaks_match_the_signal():
+    rng = np.random.default_rng(3)
+    for _ in range(2000):
+        mask = random_mask(rng)
+        signal = rng.normal(size=len(mask))
+        run_starts, run_ends = get_intervals_of_mask(mask)
+        run_peaks = get_run_peaks(signal, run_starts, run_ends)
+        np.testing.assert_array_equal(run_peaks, [np.max(signal[start:end]) for start, end in zip(run_starts, run_ends)])
+
+        tracker = IntervalTracker()
+        position = 0
+        while position < len(mask):
+            block_size = int(rng.integers(1, 50))
+            tracker.update(mask[position:position + block_size], signal[position:position + block_size])
+            position += block_size
+        np.testing.assert_array_equal(tracker.get_run_peaks(), run_peaks)
+
+        max_gap, min_len = int(rng.integers(1, 30)), int(rng.integers(1, 30))
+        starts, ends = fill_small_gaps(run_starts, run_ends, len(mask), max_gap)
+        starts, ends = remove_short_intervals(starts, ends, len(mask), min_len)
+        np.testing.assert_array_equal(get_interval_peaks(run_starts, run_peaks, starts, ends),
+                                      reference_interval_peaks(signal, run_starts, run_ends, starts, ends))
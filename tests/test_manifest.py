@@ -0,0 +1,51 @@
+import os
+import json
+
+import pandas as pd
+
+from utils.filesystem.manifest import RunManifest
+
+
+def test_resume_reads_recorded_selections(tmp_path):
+    manifest_path = str(tmp_path / "run.manifest.jsonl")
+    audio_path = str(tmp_path / "audio.wav")
+    with open(audio_path, "wb") as file:
+        file.write(b"\0" * 100)
+    selections = [pd.DataFrame({'Begin Time (s)': [0.5 * i, 3.0], 'End Time (s)': [0.6 * i, 3.5]}) for i in range(3)]
+
+    with RunManifest(manifest_path, "params") as manifest:
+        for filenumber, file_selections in enumerate(selections):
+            manifest.add(filenumber, f"file{filenumber}.wav", audio_path, file_selections, 600.0 * filenumber)
+        # a later line for the same file replaces the earlier one
+        manifest.add(1, "file1.wav", audio_path, selections[2], 600.0)
+    with open(manifest_path, "ab") as file:
+        # a line of a run with other parameters
+        file.write(json.dumps({"params": "other params", "filenumber": 5, "filename": "file5.wav", "source": {}, "offset": 0.0, "selections": {}}).encode() + b"\n")
+        # the last line of a run killed while writing it
+        file.write(b'{"params": "params", "filen')
+
+    with RunManifest(manifest_path, "params", resume=True) as manifest:
+        # the manifest only keeps the matching lines, and no selections in memory
+        assert set(manifest.finished) == {(0, "file0.wav"), (1, "file1.wav"), (2, "file2.wav")}
+        assert all(set(summary) == {"source", "offset", "position"} for summary in manifest.finished.values())
+        assert manifest.is_finished(2, "file2.wav", audio_path, 1200.0)
+        assert not manifest.is_finished(2, "file2.wav", audio_path, 1000.0)
+        assert not manifest.is_finished(3, "file3.wav", audio_path, 1800.0)
+        pd.testing.assert_frame_equal(manifest.get_selections(1, "file1.wav"), selections[2])
+        manifest.add(3, "file3.wav", audio_path, selections[0], 1800.0)
+        # reading a line does not move where the next one is added
+        pd.testing.assert_frame_equal(manifest.get_selections(0, "file0.wav"), selections[0])
+        manifest.add(4, "file4.wav", audio_path, selections[1], 2400.0)
+        pd.testing.assert_frame_equal(manifest.get_selections(3, "file3.wav"), selections[0])
+        pd.testing.assert_frame_equal(manifest.get_selections(4, "file4.wav"), selections[1])
+    with open(manifest_path) as file:
+        assert len(file.readlines()) == 5
+
+    # a changed file is detected again
+    with open(audio_path, "ab") as file:
+        file.write(b"\0")
+    with RunManifest(manifest_path, "params", resume=True) as manifest:
+        assert not manifest.is_finished(0, "file0.wav", audio_path, 0.0)
+    with RunManifest(manifest_path, "params") as manifest:
+        assert not manifest.finished
+    assert os.path.getsize(manifest_path) == 0
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filesystem.selectionfiles import ManualFiles
+from utils.score import SCORE
+from utils.segment import Segments
+
+TOTAL_TIME = 600
+
+
+def reference_segment_coverage(man_annotation, selections, segment_length, total_time):
+    """
+    The sequential walk over the segments SCORE.calc_values_for_segment_coverage replaced.
+    """
+    segments = Segments(segment_length, total_time)
+    man_index = 0
+    sel_index = 0
+    for seg in segments.segments_list:
+        man_row = man_annotation.iloc[man_index]
+        sel_row = selections.iloc[sel_index]
+
+        man_in_segment = seg.annotation_in_segment(man_row)
+        while man_in_segment:
+            if seg.seg_score != SCORE.MANUAL_ANNOTATION:
+                seg.seg_score = SCORE.MANUAL_ANNOTATION
+            seg.update_man_coverage(man_row)
+            if man_row["End Time (s)"] <= seg.end_time:
+                if man_index < len(man_annotation) - 1:
+                    man_index += 1
+                    man_row = man_annotation.iloc[man_index]
+                    man_in_segment = seg.annotation_in_segment(man_row)
+                else:
+                    man_in_segment = False
+            else:
+                man_in_segment = False
+
+        sel_in_segment = seg.annotation_in_segment(sel_row)
+        while sel_in_segment:
+            if abs(seg.seg_score) != abs(SCORE.DETECTOR_ANNOTATION):
+                seg.seg_score += SCORE.DETECTOR_ANNOTATION
+            seg.update_detector_coverage(sel_row)
+            if sel_row["End Time (s)"] <= seg.end_time:
+                if sel_index < len(selections) - 1:
+                    sel_index += 1
+                    sel_row = selections.iloc[sel_index]
+                    sel_in_segment = seg.annotation_in_segment(sel_row)
+                else:
+                    sel_in_segment = False
+            else:
+                sel_in_segment = False
+    return segments
+
+
+def random_table(rng, n_rows, total_time, zero_length=False):
+    # sorted annotations that do not overlap, some longer than a segment and some past the end
+    begin_times = np.sort(rng.uniform(0, total_time * 1.02, n_rows))
+    gaps = np.diff(np.append(begin_times, total_time * 1.05))
+    end_times = begin_times + rng.uniform(0, 1, n_rows) * np.minimum(gaps, 25)
+    if zero_length:
+        end_times[::7] = begin_times[::7]
+    return pd.DataFrame({
+        'Selection': np.arange(1, n_rows + 1),
+        'View': 'Spectrogram 1',
+        'Channel': 1,
+        'Begin Time (s)': begin_times,
+        'End Time (s)': end_times,
+        'Low Freq (Hz)': 11000,
+        'High Freq (Hz)': 37000,
+        'Tags': 'Brachyphisis',
+    })
+
+
+@pytest.mark.parametrize('segment_length', [1, 3, 7])
+def test_scores_match_sequential_walk(tmp_path, segment_length):
+    files = ManualFiles(str(tmp_path), ['03'], ['16'], hours=['000000'], manual_file_path='unused.txt')
+    score = SCORE(files, files, 'test', seg_length=segment_length)
+    assert files.get_total_time() == TOTAL_TIME
+    rng = np.random.default_rng(segment_length)
+    for _ in range(20):
+        man_annotation = random_table(rng, 40, TOTAL_TIME, zero_length=True)
+        selections = random_table(rng, 40, TOTAL_TIME)
+        score.scores_for_pr_curve(selections=selections, man_annotation=man_annotation)
+        reference = reference_segment_coverage(man_annotation, selections, segment_length, TOTAL_TIME)
+
+        np.testing.assert_array_equal(score.segments.seg_scores, reference.seg_scores)
+        np.testing.assert_allclose(score.segments.manual_coverage, reference.manual_coverage, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(score.segments.detector_coverage, reference.detector_coverage, rtol=1e-12, atol=1e-12)
+        value_map = {SCORE.FALSE_NEG: 'False Negative', SCORE.TRUE_POS: 'True Positive', SCORE.TRUE_NEG: 'True Negative', SCORE.FALSE_POS: 'False Positive'}
+        assert list(score.scores['Label']) == [value_map[seg.seg_score] for seg in reference.segments_list]
+        np.testing.assert_array_equal(score.scores['Begin Time'], [seg.start_time for seg in reference.segments_list])
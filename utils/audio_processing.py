@@ -1,5 +1,181 @@
-import librosa
+import os
+import struct
+import numpy as np
 import scipy.signal as signal
+from utils.profiling import profile_stage
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedWavError(ValueError):
+    pass
+
+
+class WavFile:
+    """
+    Memory-mapped reader for uncompressed PCM and float WAV files.
+
+    The header is parsed directly and the data chunk is memory-mapped, so reading a range of
+    samples only touches that part of the file.
+
+    Parameters
+    ----------
+    filename : String
+        The path to the WAV file.
+
+    Raises
+    ------
+    UnsupportedWavError
+        If the file is not a RIFF WAV of 8, 16, 24 or 32-bit PCM or 32 or 64-bit float samples.
+    """
+    def __init__(self, filename) -> None:
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            riff_header = file.read(12)
+            if len(riff_header) < 12 or riff_header[:4] != b'RIFF' or riff_header[8:12] != b'WAVE':
+                raise UnsupportedWavError(f"{filename} is not a RIFF WAV file")
+            file_size = os.fstat(file.fileno()).st_size
+            fmt_chunk = None
+            data_offset = None
+            while data_offset is None:
+                chunk_header = file.read(8)
+                if len(chunk_header) < 8:
+                    break
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+                if chunk_id == b'fmt ':
+                    fmt_chunk = file.read(chunk_size)
+                    file.seek(chunk_size % 2, os.SEEK_CUR)
+                elif chunk_id == b'data':
+                    data_offset = file.tell()
+                    # recorders that stop mid-file can leave the size unset, use the rest of the file
+                    data_size = min(chunk_size, file_size - data_offset)
+                else:
+                    # chunks are padded to an even number of bytes
+                    file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+        if fmt_chunk is None or data_offset is None:
+            raise UnsupportedWavError(f"{filename} has no fmt or data chunk")
+        format_tag, self.n_channels, self.sample_rate, _, block_align, self.bits_per_sample = struct.unpack('<HHIIHH', fmt_chunk[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+            # the format of an extensible file is the start of its sub-format GUID
+            format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]
+        self.format_tag = format_tag
+
+        if format_tag == WAVE_FORMAT_PCM and self.bits_per_sample in (8, 16, 24, 32):
+            self.sample_dtype = {8: np.dtype('u1'), 16: np.dtype('<i2'), 24: np.dtype('u1'), 32: np.dtype('<i4')}[self.bits_per_sample]
+        elif format_tag == WAVE_FORMAT_IEEE_FLOAT and self.bits_per_sample in (32, 64):
+            self.sample_dtype = np.dtype(f'<f{self.bits_per_sample // 8}')
+        else:
+            raise UnsupportedWavError(f"{filename} has unsupported format {format_tag} with {self.bits_per_sample} bits")
+        if block_align != self.n_channels * self.bits_per_sample // 8:
+            raise UnsupportedWavError(f"{filename} has unsupported block alignment {block_align}")
+
+        self.block_align = block_align
+        self.frames = data_size // block_align
+        self._data = np.memmap(filename, dtype=np.uint8, mode='r', offset=data_offset, shape=(self.frames * block_align,)) if self.frames else np.zeros(0, dtype=np.uint8)
+
+    def get_frames(self, start=0, stop=None):
+        """
+        Get the samples from start to stop without copying.
+
+        Returns
+        -------
+        numpy.ndarray
+            Shape (frames, channels) of the stored sample type. 24-bit samples are returned as
+            their raw bytes, with shape (frames, channels, 3).
+        """
+        start, stop, _ = slice(start, stop).indices(self.frames)
+        stop = max(start, stop)
+        raw = self._data[start * self.block_align:stop * self.block_align]
+        if self.bits_per_sample == 24:
+            return raw.reshape(stop - start, self.n_channels, 3)
+        return raw.view(self.sample_dtype).reshape(stop - start, self.n_channels)
+
+    def read(self, start=0, stop=None):
+        """
+        Read the samples from start to stop as mono float32 in [-1, 1), scaled and mixed
+        down the same way as librosa.load. Only the requested samples are copied.
+        """
+        frames = self.get_frames(start, stop)
+        if self.bits_per_sample == 8:
+            # 8-bit WAV is unsigned
+            audio_data = (frames.astype(np.float32) - 128) * np.float32(1 / 128)
+        elif self.bits_per_sample == 24:
+            # sign-extend the little-endian 3 byte samples into the top of an int32
+            samples = np.zeros(frames.shape[:2] + (4,), dtype=np.uint8)
+            samples[..., 1:] = frames
+            audio_data = samples.view('<i4')[..., 0].astype(np.float32) * np.float32(1 / 2**31)
+        elif self.format_tag == WAVE_FORMAT_PCM:
+            audio_data = frames.astype(np.float32) * np.float32(1 / 2**(self.bits_per_sample - 1))
+        else:
+            audio_data = frames.astype(np.float32)
+        if self.n_channels == 1:
+            return audio_data[:, 0]
+        return np.mean(audio_data, axis=1)
+
+
+class DecodedAudio:
+    """
+    Fallback reader for audio that WavFile does not support, such as compressed formats.
+    Decodes with soundfile, or librosa's generic decoder if soundfile cannot read the file.
+    Has the same sample_rate, frames and read(start, stop) as WavFile.
+    """
+    def __init__(self, filename) -> None:
+        # the decoders are only imported for files that need them
+        import soundfile as sf
+        self.filename = filename
+        self.audio_data = None
+        try:
+            info = sf.info(filename)
+            self.sample_rate = info.samplerate
+            self.frames = info.frames
+        except sf.LibsndfileError:
+            import librosa
+            # sr=None preserves original sampling rate
+            self.audio_data, self.sample_rate = librosa.load(filename, sr=None)
+            self.frames = len(self.audio_data)
+
+    def read(self, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(self.frames)
+        stop = max(start, stop)
+        if self.audio_data is not None:
+            return self.audio_data[start:stop]
+        import soundfile as sf
+        with sf.SoundFile(self.filename) as audio_file:
+            audio_file.seek(start)
+            audio_data = audio_file.read(stop - start, dtype='float32')
+        if audio_data.ndim > 1:
+            # mix down to mono the same way as librosa.load
+            audio_data = np.mean(audio_data, axis=1)
+        return audio_data
+
+
+def open_audio(filename):
+    """
+    Open an audio file for reading ranges of samples, with WavFile for PCM and float WAV files
+    and DecodedAudio for anything else.
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(filename)
+    try:
+        return WavFile(filename)
+    except UnsupportedWavError:
+        return DecodedAudio(filename)
+
+
+def read_audio(filename, start=None, stop=None):
+    """
+    Read samples start to stop of an audio file as mono float32.
+
+    Output:
+        audio_data
+        sample_rate
+    """
+    audio = open_audio(filename)
+    return audio.read(start, stop), audio.sample_rate
+
 
 def get_audio_segment(data, start_time, end_time, fs):
     start_sample = int(start_time * fs)
@@ -15,23 +191,208 @@ def butter_highpass(cutoff_freq, fs, order=4):
     b, a = signal.butter(order, Wn=normal_cutoff, btype='high', analog=False)
     return b,a
 
-def highpass_filter(data, cutoff_freq, fs, order=4):
+def highpass_filter(data, cutoff_freq, fs, order=4, dtype=None):
+    """
+    Zero-phase high-pass filter data with a Butterworth filter.
+
+    dtype None or numpy.float64 filters in float64. numpy.float32 filters in float32 with second-order
+    sections, which are stable in single precision where the (b, a) form is not, and returns float32.
+    cutoff_freq None does not filter, for detectors that select their band themselves.
+    """
+    if cutoff_freq is None:
+        return data if dtype is None else np.asarray(data, dtype=dtype)
+    if dtype is not None and np.dtype(dtype) == np.float32:
+        nyquist_rate = fs / 2
+        sos = signal.butter(order, Wn=cutoff_freq / nyquist_rate, btype='high', analog=False, output='sos').astype(np.float32)
+        # the same padding as filtfilt with (b, a) of this order
+        return signal.sosfiltfilt(sos, np.asarray(data, dtype=np.float32), padlen=3 * (order + 1))
     b, a = butter_highpass(cutoff_freq,fs,order)
     y = signal.filtfilt(b, a , data)
     return y
 
+def get_filter_margin(cutoff_freq, fs, order=4, tol=1e-12):
+    """
+    Number of samples for the high-pass filter's impulse response to decay below tol, 0 when cutoff_freq is None.
+    Filtering a block with this many extra samples on each side gives the same samples
+    as filtering the whole file, to within tol.
+    """
+    if cutoff_freq is None:
+        return 0
+    b, a = butter_highpass(cutoff_freq,fs,order)
+    pole_radius = np.max(np.abs(np.roots(a)))
+    # allow for the repeated poles of the forward and backward passes
+    return int(np.ceil(np.log(tol) / np.log(pole_radius))) * 2
+
 
-def get_filtered_audio_from_file(filename, filter_cutoff_freq):
+def get_filtered_audio_from_file(filename, filter_cutoff_freq, start=None, stop=None, dtype=None):
     """
+    Read and high-pass filter an audio file, or samples start to stop of it.
+    A range is filtered with enough of the audio around it to match filtering the whole file.
+    dtype is the precision of the filter, see highpass_filter.
+
     Output:
         filtered_audio
         audio_data
         sample_rate
     """
-    audio_data, sample_rate = librosa.load(filename,sr=None) # sr=None preserves original sampling rate
+    audio = open_audio(filename)
+    sample_rate = audio.sample_rate
     #* parameters for filter
     order_filter = 4
-    filtered_audio = highpass_filter(audio_data, filter_cutoff_freq, sample_rate,order_filter)
+    if start is None and stop is None:
+        with profile_stage('load', audio.frames):
+            audio_data = audio.read()
+        with profile_stage('highpass_filter', len(audio_data)):
+            filtered_audio = highpass_filter(audio_data, filter_cutoff_freq, sample_rate,order_filter, dtype)
+        return filtered_audio, audio_data, sample_rate
+
+    start, stop, _ = slice(start, stop).indices(audio.frames)
+    margin = get_filter_margin(filter_cutoff_freq, sample_rate, order_filter)
+    read_start = max(start - margin, 0)
+    read_stop = min(stop + margin, audio.frames)
+    with profile_stage('load', read_stop - read_start):
+        audio_data = audio.read(read_start, read_stop)
+    with profile_stage('highpass_filter', len(audio_data)):
+        filtered_audio = highpass_filter(audio_data, filter_cutoff_freq, sample_rate,order_filter, dtype)
+    filtered_audio = filtered_audio[start - read_start:stop - read_start]
+    audio_data = audio_data[start - read_start:stop - read_start]
     return filtered_audio, audio_data, sample_rate
 
 
+def iter_filtered_audio_blocks(filename, filter_cutoff_freq, block_size, context=(0, 0), dtype=None):
+    """
+    Read and high-pass filter an audio file one block at a time.
+
+    Each block is filtered with enough of the neighbouring audio that the output is the same
+    as get_filtered_audio_from_file, while only block_size + context samples are held at once.
+
+    Parameters
+    ----------
+    filename : String
+        The path to the audio file.
+    filter_cutoff_freq : int
+        The cutoff frequency of the high-pass filter in Hz.
+    block_size : int
+        The number of samples in each block.
+    context : tuple(int, int), default (0, 0)
+        The number of filtered samples to include before and after each block, for processing
+        that needs neighbouring samples. Clipped at the start and end of the file.
+    dtype : numpy dtype or None, default None
+        The precision of the filter, see highpass_filter.
+
+    Yields
+    ------
+    block_start : int
+        The first sample of the block in the file.
+    block_stop : int
+        The sample after the last sample of the block in the file.
+    filtered_audio : numpy.ndarray
+        The filtered audio from block_start - context[0] to block_stop + context[1].
+    offset : int
+        The index of block_start in filtered_audio.
+    sample_rate : int
+    """
+    audio = open_audio(filename)
+    sample_rate = audio.sample_rate
+    total_samples = audio.frames
+    #* parameters for filter
+    order_filter = 4
+    margin = get_filter_margin(filter_cutoff_freq, sample_rate, order_filter)
+
+    for block_start in range(0, total_samples, block_size):
+        block_stop = min(block_start + block_size, total_samples)
+        # the samples to return, and the raw audio needed to filter them
+        out_start = max(block_start - context[0], 0)
+        out_stop = min(block_stop + context[1], total_samples)
+        read_start = max(out_start - margin, 0)
+        read_stop = min(out_stop + margin, total_samples)
+
+        with profile_stage('load', read_stop - read_start):
+            audio_data = audio.read(read_start, read_stop)
+        with profile_stage('highpass_filter', len(audio_data)):
+            filtered_audio = highpass_filter(audio_data, filter_cutoff_freq, sample_rate, order_filter, dtype)
+        filtered_audio = filtered_audio[out_start - read_start:out_stop - read_start]
+
+        yield block_start, block_stop, filtered_audio, block_start - out_start, sample_rate
+
+
+# number of baseband samples converted at a time, to bound the size of the mixing arrays
+BASEBAND_BLOCK_SIZE = 2**18
+
+
+def get_decimation_factor(sample_rate, low_freq, high_freq):
+    """
+    The largest decimation factor whose complex sample rate still holds the band
+    low_freq to high_freq with a quarter of its width to spare for the anti-alias filter.
+    """
+    return max(int(sample_rate // (1.25 * (high_freq - low_freq))), 1)
+
+
+def get_baseband_filter(sample_rate, low_freq, high_freq, decimation):
+    """
+    Low-pass FIR filter for shifting the band to baseband. It passes half the bandwidth and
+    cuts off halfway to the decimated Nyquist frequency.
+    """
+    half_bandwidth = (high_freq - low_freq) / 2
+    cutoff = (half_bandwidth + sample_rate / (2 * decimation)) / 2
+    return signal.firwin(20 * decimation + 1, cutoff, window=('kaiser', 5.0), fs=sample_rate)
+
+
+def get_baseband_audio(filtered_audio, sample_rate, low_freq, high_freq, dtype=None, block_size=BASEBAND_BLOCK_SIZE):
+    """
+    Shift the band low_freq to high_freq of audio down to complex baseband and decimate it.
+
+    The audio is multiplied by a complex exponential at the centre of the band, low-pass filtered
+    to the band and decimated, in blocks with enough overlap for the filter to match converting
+    the whole array. Baseband sample k is at sample k * decimation of the audio, and twice its
+    magnitude is the amplitude envelope of the band.
+
+    Parameters
+    ----------
+    filtered_audio : numpy.ndarray
+        Real audio, high-pass filtered below low_freq.
+    sample_rate : int
+    low_freq, high_freq : int
+        The band of interest in Hz.
+    dtype : numpy dtype or None, default None
+        numpy.float32 for complex64 output, numpy.float64 for complex128. None follows filtered_audio.
+    block_size : int, default BASEBAND_BLOCK_SIZE
+        The number of baseband samples converted at a time.
+
+    Returns
+    -------
+    baseband_audio : numpy.ndarray
+    baseband_sample_rate : float
+        sample_rate / decimation.
+    decimation : int
+    """
+    decimation = get_decimation_factor(sample_rate, low_freq, high_freq)
+    centre_freq = (low_freq + high_freq) / 2
+    complex_dtype = np.result_type(filtered_audio.dtype if dtype is None else dtype, np.complex64)
+    real_dtype = np.finfo(complex_dtype).dtype
+    taps = get_baseband_filter(sample_rate, low_freq, high_freq, decimation).astype(real_dtype)
+    # the filter is centred on its middle tap, which is a whole number of decimated samples from the start
+    half_taps = len(taps) // 2
+
+    n_samples = len(filtered_audio)
+    baseband_audio = np.empty(-(-n_samples // decimation), dtype=complex_dtype)
+    # input samples either side of a block needed by the filter, a whole number of decimated samples
+    context = -(-half_taps // decimation) * decimation
+    # one table of the exponential for every block. Each block starts the table at phase 0,
+    # and its decimated output is rotated to the block's phase, since filtering is linear
+    cycles = (np.arange(block_size * decimation + 2 * context) * (centre_freq / sample_rate)) % 1.0
+    cos_table = np.cos(2 * np.pi * cycles).astype(real_dtype)
+    sin_table = np.sin(2 * np.pi * cycles).astype(real_dtype)
+    for out_start in range(0, len(baseband_audio), block_size):
+        out_stop = min(out_start + block_size, len(baseband_audio))
+        read_start = max(out_start * decimation - context, 0)
+        read_stop = min((out_stop - 1) * decimation + 1 + context, n_samples)
+        segment = np.asarray(filtered_audio[read_start:read_stop], dtype=real_dtype)
+        # filter the real and imaginary parts separately, decimating as it filters
+        first = (out_start * decimation - read_start + half_taps) // decimation
+        count = out_stop - out_start
+        block = baseband_audio[out_start:out_stop]
+        block.real = signal.upfirdn(taps, segment * cos_table[:len(segment)], 1, decimation)[first:first + count]
+        block.imag = -signal.upfirdn(taps, segment * sin_table[:len(segment)], 1, decimation)[first:first + count]
+        block *= np.exp(-2j * np.pi * ((read_start * (centre_freq / sample_rate)) % 1.0))
+    return baseband_audio, sample_rate / decimation, decimation
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import numpy as np
+from utils.audio_processing import get_filtered_audio_from_file
+
+
+class FilteredAudioCache:
+    """
+    On-disk cache of high-pass filtered audio, shared between detectors and runs.
+
+    Entries are keyed by the audio file's path, size and modification time, by the filter's
+    cutoff frequency and order and by the precision stored, so a changed file or filter is never
+    served from the cache. Filtered audio is stored as .npy files, float32 unless float64 is asked
+    for, and returned memory-mapped, so a hit reads no more of the file than is used. When the
+    cache grows past max_bytes the least recently used entries are removed.
+
+    Parameters
+    ----------
+    cache_dir : String
+        The directory to store the filtered audio in. Created if it does not exist.
+    max_bytes : int, default 50 GB
+        The maximum total size of the cached audio.
+    """
+    def __init__(self, cache_dir, max_bytes=50 * 2**30) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.evict()
+
+    def get_key(self, filename, filter_cutoff_freq, order_filter=4, dtype=np.float32):
+        file_stat = os.stat(filename)
+        identity = f"{os.path.abspath(filename)}|{file_stat.st_size}|{file_stat.st_mtime_ns}|{filter_cutoff_freq}|{order_filter}|{np.dtype(dtype).name}"
+        return hashlib.sha1(identity.encode()).hexdigest()
+
+    def get_filtered_audio(self, filename, filter_cutoff_freq, order_filter=4, dtype=np.float32):
+        """
+        Get the filtered audio of a file from the cache, filtering and storing it if it is not cached.
+        The audio is filtered in float64 and stored as dtype.
+
+        Returns
+        -------
+        filtered_audio : numpy.memmap
+            Read-only filtered audio of dtype.
+        sample_rate : int
+        """
+        cached = self.get_cached_audio(filename, filter_cutoff_freq, order_filter, dtype)
+        if cached is not None:
+            return cached
+        audio_path, info_path = self.get_entry_paths(filename, filter_cutoff_freq, order_filter, dtype)
+
+        filtered_audio, audio_data, sample_rate = get_filtered_audio_from_file(filename, filter_cutoff_freq)
+        # write to temporary files and rename, so other processes never see part of an entry.
+        # The temporary names do not end in .npy, so evict in another process leaves them alone
+        tmp_suffix = f".{os.getpid()}.tmp"
+        with open(audio_path + tmp_suffix, "wb") as file:
+            np.save(file, filtered_audio.astype(dtype), allow_pickle=False)
+        os.replace(audio_path + tmp_suffix, audio_path)
+        with open(info_path + tmp_suffix, "w") as file:
+            json.dump({"filename": os.path.abspath(filename), "sample_rate": int(sample_rate)}, file)
+        os.replace(info_path + tmp_suffix, info_path)
+
+        # load before evicting, the mapping stays valid even if this entry is the one removed
+        cached = self._load(audio_path, info_path)
+        self.evict()
+        return cached
+
+    def get_cached_audio(self, filename, filter_cutoff_freq, order_filter=4, dtype=np.float32):
+        """
+        Get the filtered audio of a file if it is already cached, see get_filtered_audio.
+
+        Returns
+        -------
+        tuple(numpy.memmap, int) or None
+            The filtered audio and sample rate, or None if the file is not cached.
+        """
+        try:
+            return self._load(*self.get_entry_paths(filename, filter_cutoff_freq, order_filter, dtype))
+        except FileNotFoundError:
+            return None
+
+    def get_entry_paths(self, filename, filter_cutoff_freq, order_filter=4, dtype=np.float32):
+        key = self.get_key(filename, filter_cutoff_freq, order_filter, dtype)
+        return os.path.join(self.cache_dir, f"{key}.npy"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, audio_path, info_path):
+        with open(info_path) as file:
+            sample_rate = json.load(file)["sample_rate"]
+        filtered_audio = np.load(audio_path, mmap_mode='r')
+        # mark the entry as recently used for eviction
+        os.utime(audio_path)
+        return filtered_audio, sample_rate
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is no larger than max_bytes.
+        """
+        entries = []
+        # entries being written end in .tmp and are not counted
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    # removed by another process since the scan
+                    continue
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            for entry_path in (path, path[:-len(".npy")] + ".json"):
+                try:
+                    os.remove(entry_path)
+                except FileNotFoundError:
+                    # already removed by another process
+                    pass
+            total_bytes -= size
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith((".npy", ".json")):
+                os.remove(entry.path)
+
+
+class SelectionTableCache:
+    """
+    On-disk cache of parsed Raven selection tables.
+
+    Entries are keyed by the selection table's path, size and modification time, so an edited
+    table is parsed again. Tables are stored as pickled DataFrames, which load without parsing text.
+
+    Parameters
+    ----------
+    cache_dir : String
+        The directory to store the parsed tables in. Created if it does not exist.
+    """
+    def __init__(self, cache_dir) -> None:
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, filename):
+        file_stat = os.stat(filename)
+        identity = f"{os.path.abspath(filename)}|{file_stat.st_size}|{file_stat.st_mtime_ns}"
+        return hashlib.sha1(identity.encode()).hexdigest()
+
+    def get_selections(self, filename):
+        """
+        Get the selections of a selection table from the cache, parsing and storing it if it is not cached.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        import pandas as pd
+        key = self.get_key(filename)
+        table_path = os.path.join(self.cache_dir, f"{key}.pkl")
+        try:
+            return pd.read_pickle(table_path)
+        except FileNotFoundError:
+            pass
+
+        selections = pd.read_csv(filename, sep="\t", header=0)
+        # write to a temporary file and rename, so other processes never see part of an entry
+        tmp_path = f"{table_path}.{os.getpid()}.tmp"
+        selections.to_pickle(tmp_path)
+        os.replace(tmp_path, table_path)
+        return selections
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                os.remove(entry.path)
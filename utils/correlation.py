@@ -0,0 +1,171 @@
+import numpy as np
+import scipy.fft
+from utils.profiling import profile_stage
+
+# FFT sizes are chosen as the power of two above this many template lengths,
+# so each block of overlap-save keeps most of its output
+BLOCK_TEMPLATE_LENGTHS = 4
+MIN_FFT_SIZE = 2**14
+
+
+def get_fft_size(template_len):
+    """
+    The power of two FFT size above BLOCK_TEMPLATE_LENGTHS template lengths.
+    """
+    nfft = max(BLOCK_TEMPLATE_LENGTHS * template_len, MIN_FFT_SIZE)
+    return 2**int(np.ceil(np.log2(nfft)))
+
+
+def float32_allowed(threshold, nfft):
+    """
+    Check that a normalised correlation threshold is far enough above the rounding error
+    of a float32 FFT of size nfft for float32 correlation to give the same detections.
+    """
+    rounding_error = np.finfo(np.float32).eps * np.log2(nfft)
+    return threshold > 1000 * rounding_error
+
+
+class SpectrumTransform:
+    """
+    The FFTs used for correlation, real (rfft) for real audio and complex (fft) for baseband audio.
+
+    Parameters
+    ----------
+    is_complex : bool
+    dtype : numpy dtype
+        The real precision, numpy.float32 or numpy.float64.
+    """
+    def __init__(self, is_complex, dtype) -> None:
+        self.is_complex = is_complex
+        self.work_dtype = np.result_type(dtype, np.complex64) if is_complex else np.dtype(dtype)
+
+    def next_fast_len(self, n):
+        return scipy.fft.next_fast_len(n, real=not self.is_complex)
+
+    def forward(self, data, n):
+        data = np.asarray(data, dtype=self.work_dtype)
+        if self.is_complex:
+            return scipy.fft.fft(data, n=n)
+        return scipy.fft.rfft(data, n=n)
+
+    def inverse(self, spectrum, n):
+        if self.is_complex:
+            return scipy.fft.ifft(spectrum, n=n, axis=-1)
+        return scipy.fft.irfft(spectrum, n=n, axis=-1)
+
+
+class TemplateCorrelator:
+    """
+    Cross-correlate audio with a fixed template using overlap-save blocks.
+
+    The template's spectrum is computed once, at a fast FFT size, and reused for every block
+    of every file. Only the lags that start inside the audio are computed, which are the samples
+    kept from scipy.signal.correlate(audio, template, mode='full')[len(template)-1:].
+    A complex (baseband) template is correlated with complex audio, conjugating the template.
+
+    Parameters
+    ----------
+    template : numpy.ndarray
+        The template to correlate audio with.
+    dtype : numpy dtype, default numpy.float64
+        The precision of the correlation, numpy.float32 or numpy.float64.
+    nfft : int or None, default None
+        The FFT size of each block. If None use get_fft_size.
+    """
+    def __init__(self, template, dtype=np.float64, nfft=None) -> None:
+        self.dtype = np.dtype(dtype)
+        self.template_len = len(template)
+        self.transform = SpectrumTransform(np.iscomplexobj(template), self.dtype)
+        if nfft is None:
+            nfft = get_fft_size(self.template_len)
+        self.nfft = self.transform.next_fast_len(nfft)
+        # number of lags each block produces without wrapping around
+        self.step = self.nfft - self.template_len + 1
+        self.template_spectrum = np.conj(self.transform.forward(template, self.nfft))
+
+    def correlate(self, audio, n_lags=None):
+        """
+        Correlate audio with the template. Audio after the end of the array is treated as zero.
+
+        Parameters
+        ----------
+        audio : numpy.ndarray
+        n_lags : int or None, default None
+            The number of lags to compute, starting from 0. If None, compute len(audio) lags.
+
+        Returns
+        -------
+        numpy.ndarray
+            correlation[k] = sum(audio[k:k+len(template)] * template)
+        """
+        if n_lags is None:
+            n_lags = len(audio)
+        correlation = np.empty(n_lags, dtype=self.transform.work_dtype)
+        for start in range(0, n_lags, self.step):
+            block_spectrum = self.transform.forward(audio[start:start + self.nfft], self.nfft)
+            block_correlation = self.transform.inverse(block_spectrum * self.template_spectrum, self.nfft)
+            count = min(self.step, n_lags - start)
+            correlation[start:start + count] = block_correlation[:count]
+        return correlation
+
+
+class TemplateBankCorrelator:
+    """
+    Cross-correlate audio with a bank of templates at once, combined into one score per lag.
+
+    Each overlap-save block of audio is transformed once and multiplied by every template's spectrum,
+    and the inverse transforms of all the templates are done as one batched FFT. The score at each lag
+    is the largest absolute correlation over the templates, each divided by its own norm factor.
+    Shorter templates are zero-padded to the longest, which does not change their correlation.
+    Complex (baseband) templates score the magnitude of the complex correlation.
+
+    Parameters
+    ----------
+    templates : list of numpy.ndarray
+        The templates to correlate audio with.
+    norm_factors : list of float
+        The value each template's correlation is divided by.
+    dtype : numpy dtype, default numpy.float64
+        The precision of the correlation, numpy.float32 or numpy.float64.
+    nfft : int or None, default None
+        The FFT size of each block. If None use get_fft_size of the longest template.
+    """
+    def __init__(self, templates, norm_factors, dtype=np.float64, nfft=None) -> None:
+        self.dtype = np.dtype(dtype)
+        self.n_templates = len(templates)
+        self.template_len = max(len(template) for template in templates)
+        self.transform = SpectrumTransform(any(np.iscomplexobj(template) for template in templates), self.dtype)
+        if nfft is None:
+            nfft = get_fft_size(self.template_len)
+        self.nfft = self.transform.next_fast_len(nfft)
+        # number of lags each block produces without wrapping around for the longest template
+        self.step = self.nfft - self.template_len + 1
+        self.template_spectra = np.stack([np.conj(self.transform.forward(template, self.nfft)) for template in templates])
+        # one row per template, to broadcast over the lags of a block
+        self.norm_factors = np.asarray(norm_factors, dtype=self.dtype).reshape(-1, 1)
+
+    def correlate(self, audio, n_lags=None):
+        """
+        Correlate audio with every template. Audio after the end of the array is treated as zero.
+
+        Parameters
+        ----------
+        audio : numpy.ndarray
+        n_lags : int or None, default None
+            The number of lags to compute, starting from 0. If None, compute len(audio) lags.
+
+        Returns
+        -------
+        numpy.ndarray
+            score[k] = max over templates of abs(sum(audio[k:k+len(template)] * template)) / norm_factor
+        """
+        if n_lags is None:
+            n_lags = len(audio)
+        score = np.empty(n_lags, dtype=self.dtype)
+        with profile_stage('correlation', n_lags):
+            for start in range(0, n_lags, self.step):
+                block_spectrum = self.transform.forward(audio[start:start + self.nfft], self.nfft)
+                block_correlations = self.transform.inverse(block_spectrum * self.template_spectra, self.nfft)
+                count = min(self.step, n_lags - start)
+                score[start:start + count] = np.max(np.abs(block_correlations[:, :count]) / self.norm_factors, axis=0)
+        return score
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 class BaseFiles:
     """
@@ -18,12 +20,17 @@ class BaseFiles:
     extra : dict or None, default None
         If there are any extra selections to add to the array that do not involve all the hours in hours parameter.
         Must include months, days, and hours.
+    index : utils.filesystem.deploymentindex.DeploymentIndex or None, default None
+        Index of the deployment's recordings. If given, files whose recording is not in the index are left out of
+        files_list, and the offsets and total time come from the real durations of the recordings. If None every
+        file is taken to be FILE_LENGTH seconds long.
     """
     
     FILE_LENGTH = 600 # seconds 
 
-    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001', totalfiles=None, files_list=None) -> None:
+    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001', totalfiles=None, files_list=None, index=None) -> None:
         self.root_dir = root_dir
+        self.index = index
         self.months = months
         self.days = days
         self.year = year
@@ -58,10 +65,60 @@ class BaseFiles:
             'get_files method not implemented in derived class'
         )
     
+    @property
+    def files_list(self):
+        return self._files_list
+
+    @files_list.setter
+    def files_list(self, files_list):
+        self._files_list = files_list
+        # offsets of the files in files_list from the index, computed when first needed
+        self._offsets = None
+
+    def get_offsets(self):
+        """
+        Get the time in seconds from the start of the first file in self.files_list to the start of each file.
+        """
+        if self.index is None:
+            return self.FILE_LENGTH * np.arange(len(self.files_list))
+        if self._offsets is None or len(self._offsets) != len(self.files_list):
+            self._offsets = self.index.get_offsets(self.files_list)
+        return self._offsets
+
+    def get_offset(self, filenumber):
+        """
+        Get the time in seconds from the start of the first file in self.files_list to the start of file filenumber.
+        """
+        if self.index is None:
+            return self.FILE_LENGTH * filenumber
+        return self.get_offsets()[filenumber]
+
+    def get_total_time(self):
+        """
+        Get the length in seconds of the recordings the files cover.
+        """
+        if self.index is None:
+            return self.total_files * self.FILE_LENGTH
+        # the hours without a recording have no time
+        return float(np.sum(self.index.get_durations(self.get_recording_names(), missing_ok=True)))
+
+    def get_recording_names(self, extra=False):
+        """
+        Get the names of the recordings for months, days and hours, e.g. 6_20230316_000000, and for self.extra.
+        """
+        if extra:
+            months, days, hours, year = self.extra['months'], self.extra['days'], self.extra['hours'], self.extra['year']
+        else:
+            months, days, hours, year = self.months, self.days, self.hours, self.year
+        recording_names = [f'6_{year}{month}{day}_{hour}' for month in months for day in days for hour in hours]
+        if (not extra) and (self.extra is not None):
+            recording_names.extend(self.get_recording_names(extra=True))
+        return recording_names
+
     def get_total_files(self):
         total_files = len(self.months) * len(self.days) * len(self.hours)
         if self.extra is not None:
             total_files += len(self.extra['months']) * len(self.extra['days']) * len(self.extra['hours'])
         return total_files
     
-__all__ = ['AudioFiles', 'SelectionFiles','ManualFiles']
\ No newline at end of file
+__all__ = ['AudioFiles', 'SelectionFiles','ManualFiles','SelectionWriter','RunManifest','DeploymentIndex']
\ No newline at end of file
@@ -1,9 +1,14 @@
+import os
+import re
 from . import BaseFiles
 
+# site number, then date and time of the start of the recording
+RECORDING_NAME = re.compile(r'^\d+_\d{8}_\d{6}\.wav$')
+
 class AudioFiles(BaseFiles):
     
-    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001', total_files=None, files_list=None) -> None:
-        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files,files_list)
+    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001', total_files=None, files_list=None, index=None) -> None:
+        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files,files_list, index)
 
     def get_files(self, extra=False):
         """
@@ -42,5 +47,21 @@ class AudioFiles(BaseFiles):
             extra_files = self.get_files(extra=True)
             audio_files_list.extend(extra_files)
 
+        if (not extra) and (self.index is not None):
+            # only the recordings that exist
+            audio_files_list = [filename for filename in audio_files_list if filename in self.index]
+
+        return audio_files_list
+
+    def scan_files(self):
+        """
+        Get the recordings in self.root_dir, named like 6_20230316_000000.wav, in the order they were recorded.
 
-        return audio_files_list
\ No newline at end of file
+        Returns
+        -------
+        list
+            The list of audio file names.
+        """
+        audio_files_list = [entry.name for entry in os.scandir(self.root_dir) if RECORDING_NAME.match(entry.name)]
+        # sort on the date and time, after the site number
+        return sorted(audio_files_list, key=lambda filename: filename.split('_', 1)[1])
@@ -0,0 +1,163 @@
+import os
+import json
+from datetime import datetime
+import numpy as np
+from utils.audio_processing import open_audio
+from .audiofiles import RECORDING_NAME
+
+class DeploymentIndex:
+    """
+    Index of the recordings of a deployment, with the real length of each file.
+
+    The directory is scanned once and each recording's WAV header is read for its sample rate
+    and number of frames, so the files that exist and their true durations are known before
+    detecting. The index is kept in a JSON file and refreshed incrementally: only the headers
+    of files that are new or whose size or modification time changed are read again.
+
+    Recordings are looked up by the name of any file named after them, e.g. 6_20230316_000000.wav
+    or 6_20230316_000000.selections.txt, and ordered by their start time. A recording that arrived
+    after the scan has its header read and is added to the index when it is first looked up.
+
+    Parameters
+    ----------
+    root_dir : String
+        The directory of the recordings.
+    index_path : String or None, default None
+        The JSON file to keep the index in. If None use deployment_index.json in root_dir.
+    """
+    def __init__(self, root_dir, index_path=None) -> None:
+        self.root_dir = root_dir
+        if index_path is None:
+            index_path = os.path.join(root_dir, "deployment_index.json")
+        self.index_path = index_path
+        # recording name without extension -> entry, in the order they were recorded
+        self.recordings = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        Scan root_dir and update the index, reading the headers of new and changed recordings only.
+        """
+        indexed = self.load()
+        recordings = {}
+        changed = False
+        for entry in os.scandir(self.root_dir):
+            if not RECORDING_NAME.match(entry.name):
+                continue
+            # the name without .wav
+            recording_name = entry.name[:-4]
+            file_stat = entry.stat()
+            recording = indexed.get(recording_name)
+            if recording is None or recording["size"] != file_stat.st_size or recording["mtime_ns"] != file_stat.st_mtime_ns:
+                recording = self.read_recording(entry.name, file_stat)
+                changed = True
+            recordings[recording_name] = recording
+
+        self.recordings = dict(sorted(recordings.items(), key=lambda item: item[1]["start_time"]))
+        if changed or recordings.keys() != indexed.keys():
+            self.save()
+
+    def read_recording(self, filename, file_stat):
+        audio = open_audio(os.path.join(self.root_dir, filename))
+        # site number, then date and time of the start of the recording
+        _, date, time = filename[:-4].split('_')
+        return {
+            "filename": filename,
+            "start_time": datetime.strptime(date + time, "%Y%m%d%H%M%S").isoformat(),
+            "sample_rate": int(audio.sample_rate),
+            "frames": int(audio.frames),
+            "duration": audio.frames / audio.sample_rate,
+            "size": file_stat.st_size,
+            "mtime_ns": file_stat.st_mtime_ns,
+        }
+
+    def add_recording(self, filename):
+        """
+        Read the header of the recording a file is named after and add it to the index.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the recording is not in root_dir.
+        """
+        recording_name = get_recording_name(filename)
+        recording_filename = f"{recording_name}.wav"
+        file_stat = os.stat(os.path.join(self.root_dir, recording_filename))
+        recording = self.read_recording(recording_filename, file_stat)
+        self.recordings[recording_name] = recording
+        self.recordings = dict(sorted(self.recordings.items(), key=lambda item: item[1]["start_time"]))
+        self.save()
+        return recording
+
+    def load(self):
+        try:
+            with open(self.index_path) as file:
+                return json.load(file)["recordings"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return {}
+
+    def save(self):
+        # write to a temporary file and rename, so a reader never sees part of the index
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"root_dir": os.path.abspath(self.root_dir), "recordings": self.recordings}, file)
+        os.replace(tmp_path, self.index_path)
+
+    def __contains__(self, filename):
+        return get_recording_name(filename) in self.recordings
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def get_recording(self, filename):
+        """
+        Get the entry of the recording a file is named after, or None if it is not in the index.
+        """
+        return self.recordings.get(get_recording_name(filename))
+
+    def get_files(self):
+        """
+        Get the audio file names of the recordings, in the order they were recorded.
+        """
+        return [recording["filename"] for recording in self.recordings.values()]
+
+    def get_durations(self, files_list, missing_ok=False):
+        """
+        Get the duration in seconds of the recording of each file in files_list.
+        Recordings not in the index are read and added, see add_recording.
+
+        Parameters
+        ----------
+        files_list : list of String
+        missing_ok : bool, default False
+            True to give a duration of 0 for recordings that do not exist, False to raise FileNotFoundError.
+        """
+        durations = np.zeros(len(files_list))
+        for i, filename in enumerate(files_list):
+            recording = self.recordings.get(get_recording_name(filename))
+            if recording is None:
+                try:
+                    recording = self.add_recording(filename)
+                except FileNotFoundError:
+                    if missing_ok:
+                        continue
+                    raise FileNotFoundError(f"No recording of {filename} in {self.root_dir}") from None
+            durations[i] = recording["duration"]
+        return durations
+
+    def get_offsets(self, files_list, missing_ok=False):
+        """
+        Get the time in seconds from the start of the first file in files_list to the start of each file,
+        adding up the real durations of the files before it. See get_durations.
+        """
+        if len(files_list) == 0:
+            return np.zeros(0)
+        # the last file's duration does not move any start
+        return np.concatenate(([0.0], np.cumsum(self.get_durations(files_list[:-1], missing_ok))))
+
+
+def get_recording_name(filename):
+    """
+    The name of the recording a file is named after, e.g. 6_20230316_000000 for 6_20230316_000000.selections.txt.
+    """
+    return os.path.basename(filename).split('.', 1)[0]
@@ -0,0 +1,123 @@
+import os
+import json
+
+class RunManifest:
+    """
+    Record of the files a detection run has finished, so an interrupted run can resume.
+
+    The manifest is a JSON lines file with one line per finished audio file, holding the hash of
+    the detector's parameters, the file's size and modification time, its offset from the start of
+    the deployment and its selections. Lines are flushed and synced as they are added, so the finished
+    files survive a crash. A file's recorded selections are only reused when the parameters hash,
+    the file and its offset are unchanged.
+
+    Only the source, offset and position in the manifest of each finished file are kept in memory,
+    and a file's selections are read from its line when they are needed.
+
+    Parameters
+    ----------
+    manifest_path : String
+        The path of the manifest.
+    params_hash : String
+        The hash of the parameters of the detection run.
+    resume : bool, default False
+        True to keep the matching lines of an existing manifest, False to start a new one.
+    """
+    def __init__(self, manifest_path, params_hash, resume=False) -> None:
+        self.manifest_path = manifest_path
+        self.params_hash = params_hash
+        # (filenumber, filename) -> source, offset and position in the manifest of the line of a finished file
+        self.finished = {}
+        # position in the existing manifest of the last matching line of each file
+        kept_lines = {}
+        if resume and os.path.exists(manifest_path):
+            with open(manifest_path, "rb") as file:
+                position = 0
+                for line in file:
+                    line_position = position
+                    position += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line of a run killed while writing it
+                        continue
+                    if entry["params"] == self.params_hash:
+                        key = (entry["filenumber"], entry["filename"])
+                        kept_lines[key] = line_position
+                        self.finished[key] = self.get_summary(entry, None)
+
+        # rewrite with only the lines still valid, copied one at a time, then append to it
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            if kept_lines:
+                with open(manifest_path, "rb") as old_file:
+                    for key, line_position in kept_lines.items():
+                        old_file.seek(line_position)
+                        self.finished[key]["position"] = file.tell()
+                        line = old_file.readline()
+                        file.write(line if line.endswith(b"\n") else line + b"\n")
+        os.replace(tmp_path, manifest_path)
+        # appends always go to the end, whatever line was last read
+        self.file = open(manifest_path, "a+b")
+
+    def get_summary(self, entry, position):
+        summary = {"source": entry["source"], "position": position}
+        if "offset" in entry:
+            summary["offset"] = entry["offset"]
+        return summary
+
+    def get_source(self, path_to_file):
+        file_stat = os.stat(path_to_file)
+        return {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+
+    def is_finished(self, filenumber, filename, path_to_file, offset=None):
+        """
+        Check that a file has been finished with these parameters and has not changed since.
+        """
+        summary = self.finished.get((filenumber, filename))
+        if summary is None:
+            return False
+        # the selections are relative to the deployment, so they are stale if the files before it changed length
+        if offset is not None and summary.get("offset", offset) != offset:
+            return False
+        try:
+            return summary["source"] == self.get_source(path_to_file)
+        except FileNotFoundError:
+            return False
+
+    def get_selections(self, filenumber, filename):
+        """
+        Read the recorded selections of a finished file, see is_finished.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        import pandas as pd
+        self.file.seek(self.finished[(filenumber, filename)]["position"])
+        entry = json.loads(self.file.readline())
+        return pd.DataFrame(entry["selections"])
+
+    def add(self, filenumber, filename, path_to_file, selections, offset=None):
+        entry = {
+            "params": self.params_hash,
+            "filenumber": filenumber,
+            "filename": filename,
+            "source": self.get_source(path_to_file),
+            "offset": offset,
+            "selections": selections.to_dict(orient="list"),
+        }
+        self.file.seek(0, os.SEEK_END)
+        self.finished[(filenumber, filename)] = self.get_summary(entry, self.file.tell())
+        self.file.write((json.dumps(entry) + "\n").encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,10 +1,14 @@
 
+from concurrent.futures import ThreadPoolExecutor
 from . import BaseFiles
-import pandas as pd
 
 class SelectionFiles(BaseFiles):
-    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001',total_files=None, files_list=None) -> None:
-        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files,files_list)
+    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001',total_files=None, files_list=None, cache=None, n_threads=1, index=None) -> None:
+        # utils.cache.SelectionTableCache to keep the parsed tables between runs, None parses every time
+        self.cache = cache
+        # number of threads to read the selection files in
+        self.n_threads = n_threads
+        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files,files_list, index)
 
     def get_files(self, extra=False):
         """
@@ -43,32 +47,58 @@ class SelectionFiles(BaseFiles):
             extra_files = self.get_files(extra=True)
             selection_files_list.extend(extra_files)
 
+        if (not extra) and (self.index is not None):
+            # only the selections of recordings that exist
+            selection_files_list = [sel_file for sel_file in selection_files_list if sel_file in self.index]
 
         return selection_files_list
     
+    def read_selection_file(self, sel_file):
+        import pandas as pd
+        path = f"{self.root_dir}/{sel_file}"
+        if self.cache is not None:
+            return self.cache.get_selections(path)
+        return pd.read_csv(path,sep="\t",header=0)
+
     def combine_selection_files(self):
-        self.reset_filenumber()
-        selections = pd.read_csv(f"{self.root_dir}/{self.files_list[0]}",sep="\t",header=0)
-        self.update_filenumber()
-        for sel_file in self.files_list[1:]:
-            df = pd.read_csv(f"{self.root_dir}/{sel_file}",sep="\t",header=0)
-            df['Begin Time (s)'] = df['Begin Time (s)'] + (self.FILE_LENGTH * self.filenumber)
-            df['End Time (s)'] = df['End Time (s)'] + (self.FILE_LENGTH * self.filenumber)
-            self.update_filenumber()
-            selections = pd.concat([selections, df], axis=0, ignore_index=True)
-        self.reset_filenumber()
+        """
+        Read every selection file in self.files_list into one table of selections, with the times
+        relative to the start of the first file.
+
+        The files are read (in self.n_threads threads) and concatenated once, then each file's
+        rows are offset by the start of its file, FILE_LENGTH times its position in self.files_list,
+        or the real durations of the files before it with an index.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The selections sorted by begin time.
+        """
+        import numpy as np
+        import pandas as pd
+        if self.n_threads > 1:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+                tables = list(executor.map(self.read_selection_file, self.files_list))
+        else:
+            tables = [self.read_selection_file(sel_file) for sel_file in self.files_list]
+
+        selections = pd.concat(tables, axis=0, ignore_index=True)
+        # offset of each row's file from the start of the first file
+        offsets = np.repeat(self.get_offsets(), [len(table) for table in tables])
+        selections['Begin Time (s)'] = selections['Begin Time (s)'] + offsets
+        selections['End Time (s)'] = selections['End Time (s)'] + offsets
         selections = selections.sort_values(by='Begin Time (s)', ascending=True)
         print(f'Combined Selections, Final Selections have shape {selections.shape}')
         return selections
     
 
 class ManualFiles(SelectionFiles):
-    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001',total_files=None, manual_file_path=None, files_list=None) -> None:
+    def __init__(self, root_dir, months, days, hours=None, year='2023', extra=None, site='06', dep='001',total_files=None, manual_file_path=None, files_list=None, cache=None, n_threads=1, index=None) -> None:
         if manual_file_path is not None:
             self.file_path = manual_file_path
         else:
             self.file_path = None
-        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files, files_list)
+        super().__init__(root_dir, months, days, hours, year, extra, site, dep, total_files, files_list, cache, n_threads, index)
         
 
     def get_files(self, extra=False):
@@ -92,19 +122,3 @@ class ManualFiles(SelectionFiles):
             selection_files_list.append(self.file_path)
 
         return selection_files_list
-    
-    def combine_selection_files(self):
-        self.reset_filenumber()
-        selections = pd.read_csv(f"{self.root_dir}/{self.files_list[0]}",sep="\t",header=0)
-        self.update_filenumber()
-        for sel_file in self.files_list[1:]:
-            df = pd.read_csv(f"{self.root_dir}/{sel_file}",sep="\t",header=0)
-            df['Begin Time (s)'] = df['Begin Time (s)'] + (self.FILE_LENGTH * self.filenumber)
-            df['End Time (s)'] = df['End Time (s)'] + (self.FILE_LENGTH * self.filenumber)
-            self.update_filenumber()
-            selections = pd.concat([selections, df], axis=0, ignore_index=True)
-        self.reset_filenumber()
-        selections = selections.sort_values(by='Begin Time (s)', ascending=True)
-        print(f'Combined Selections, Final Selections have shape {selections.shape}')
-        return selections
- 
\ No newline at end of file
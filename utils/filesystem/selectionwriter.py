@@ -0,0 +1,48 @@
+import os
+
+class SelectionWriter:
+    """
+    Write a Raven selection table one audio file at a time.
+
+    The header is written when the writer is opened, and each file's selections are appended
+    and flushed as soon as they are written, so the table never has to be held in memory
+    and the selections of finished files are kept if the run stops part way.
+    The output is the same as writing the concatenated selections with DataFrame.to_csv(sep='\\t').
+
+    Parameters
+    ----------
+    write_path : String
+        The path of the selection table to write. Overwritten if it exists.
+    """
+    COLUMNS = ["Begin Time (s)", "End Time (s)", "Low Freq (Hz)", "High Freq (Hz)", "Begin File", "File Offset (s)", "Tags", "Correct"]
+
+    def __init__(self, write_path) -> None:
+        self.write_path = write_path
+        self.file = open(write_path, "w")
+        # the first column is the DataFrame index, which has no name
+        self.file.write("\t" + "\t".join(self.COLUMNS) + "\n")
+        self.file.flush()
+
+    def write(self, selections):
+        """
+        Append the selections of one audio file.
+
+        Parameters
+        ----------
+        selections : pandas.DataFrame
+            The selections with the columns in COLUMNS.
+        """
+        if len(selections) == 0:
+            return
+        selections[self.COLUMNS].to_csv(self.file, header=False, sep='\t')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,293 @@
+import numpy as np
+
+# Run-length (interval) form of the detector labels.
+# Runs of detections are stored as sorted, non-overlapping [start, end) sample intervals,
+# so gap filling and short run removal are done per run rather than per sample.
+# The functions keep the detections of the original per-sample label processing, including that
+# a gap or run reaching the end of the file is measured to the last sample rather than past it.
+
+def get_intervals_of_mask(mask):
+    """
+    Get the runs of True in a boolean (or 0/non-zero) mask.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+        The start and (exclusive) end sample of each run.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    padded = np.zeros(len(mask) + 2, dtype=np.int8)
+    padded[1:-1] = mask
+    diffs = np.diff(padded)
+    starts = np.flatnonzero(diffs == 1)
+    ends = np.flatnonzero(diffs == -1)
+    return starts, ends
+
+
+def get_run_peaks(signal, starts, ends):
+    """
+    Get the largest value of signal in each run.
+    """
+    if len(starts) == 0:
+        return np.array([], dtype=np.float64)
+    # the maximum from each start up to the next index, which is the run's end
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    padded = np.append(np.asarray(signal, dtype=np.float64), -np.inf) if ends[-1] == len(signal) else np.asarray(signal, dtype=np.float64)
+    return np.maximum.reduceat(padded, bounds)[0::2]
+
+
+def get_interval_peaks(run_starts, run_peaks, starts, ends):
+    """
+    Get the largest peak of the runs starting in each interval, after the runs are joined
+    and removed by fill_small_gaps and remove_short_intervals. NaN for an interval with no runs.
+    """
+    run_starts = np.asarray(run_starts, dtype=np.int64)
+    first_runs = np.searchsorted(run_starts, starts)
+    stop_runs = np.searchsorted(run_starts, ends)
+    peaks = np.full(len(starts), np.nan)
+    has_runs = first_runs < stop_runs
+    if np.any(has_runs):
+        bounds = np.empty(2 * np.count_nonzero(has_runs), dtype=np.int64)
+        bounds[0::2] = first_runs[has_runs]
+        bounds[1::2] = stop_runs[has_runs]
+        padded = np.append(np.asarray(run_peaks, dtype=np.float64), -np.inf)
+        peaks[has_runs] = np.maximum.reduceat(padded, bounds)[0::2]
+    return peaks
+
+
+def fill_small_gaps(starts, ends, length, max_gap):
+    """
+    Join runs separated by fewer than max_gap samples.
+
+    The gap before the first run and after the last run are also filled when they are short.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts) == 0:
+        # the whole file is one gap, which ends one sample before the end of the file
+        if 0 < length - 1 < max_gap:
+            return np.array([0]), np.array([length - 1])
+        return starts, ends
+
+    keep_gap = (starts[1:] - ends[:-1]) >= max_gap
+    starts = starts[np.concatenate(([True], keep_gap))]
+    ends = ends[np.concatenate((keep_gap, [True]))]
+
+    if 0 < starts[0] < max_gap:
+        starts[0] = 0
+    if ends[-1] < length and (length - 1 - ends[-1]) < max_gap:
+        ends[-1] = length - 1
+    return starts, ends
+
+
+def remove_short_intervals(starts, ends, length, min_len):
+    """
+    Remove runs shorter than min_len samples.
+
+    A short run that reaches the end of the file leaves its last sample behind.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    run_lengths = np.minimum(ends, length - 1) - starts
+    keep = run_lengths >= min_len
+    if len(ends) and ends[-1] == length and not keep[-1]:
+        keep[-1] = True
+        starts = starts.copy()
+        starts[-1] = length - 1
+    return starts[keep], ends[keep]
+
+
+def get_mask_of_intervals(starts, ends, length):
+    """
+    Get the boolean mask of a file of length samples that is True inside the runs.
+    """
+    changes = np.zeros(length + 1, dtype=np.int8)
+    changes[starts] += 1
+    changes[ends] -= 1
+    return np.cumsum(changes[:-1], dtype=np.int8).astype(bool)
+
+
+def get_selection_bounds(starts, ends, length):
+    """
+    Get the start and end samples written to the selections for each run.
+    A run that reaches the end of the file ends on the last sample.
+    """
+    ends = np.where(ends == length, length - 1, ends)
+    return starts, ends
+
+
+class IntervalTracker:
+    """
+    Collect the runs of True in a mask that arrives in consecutive blocks.
+
+    Runs that cross a block boundary are kept open until they end, so the result is the same
+    as get_intervals_of_mask on the whole mask while only one block is held at a time.
+    The peak of a signal in each run can be tracked too, see update and get_run_peaks.
+    """
+    def __init__(self) -> None:
+        self.length = 0
+        self.last_value = False
+        self.starts = []
+        self.ends = []
+        self.peaks = []
+
+    def update(self, mask, signal=None):
+        """
+        Add the next block of the mask, and the block of the signal to track the peak of each run in, if any.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) == 0:
+            return
+        if signal is not None:
+            block_peaks = get_run_peaks(signal, *get_intervals_of_mask(mask))
+            if self.last_value and mask[0]:
+                # the first run of the block continues the open run
+                self.peaks[-1][-1] = max(self.peaks[-1][-1], block_peaks[0])
+                block_peaks = block_peaks[1:]
+            if len(block_peaks):
+                self.peaks.append(block_peaks)
+        padded = np.empty(len(mask) + 1, dtype=np.int8)
+        padded[0] = self.last_value
+        padded[1:] = mask
+        diffs = np.diff(padded)
+        self.starts.append(np.flatnonzero(diffs == 1) + self.length)
+        self.ends.append(np.flatnonzero(diffs == -1) + self.length)
+        self.length += len(mask)
+        self.last_value = bool(mask[-1])
+
+    def get_intervals(self):
+        """
+        Returns
+        -------
+        starts, ends : numpy.ndarray
+            The start and (exclusive) end sample of each run seen so far. An open run ends at self.length.
+        """
+        starts = np.concatenate(self.starts) if self.starts else np.array([], dtype=np.int64)
+        ends = np.concatenate(self.ends) if self.ends else np.array([], dtype=np.int64)
+        if self.last_value:
+            ends = np.append(ends, self.length)
+        return starts.astype(np.int64), ends.astype(np.int64)
+
+    def get_run_peaks(self):
+        """
+        Returns
+        -------
+        numpy.ndarray
+            The peak of the signal in each run of get_intervals, if a signal was given with every block.
+        """
+        return np.concatenate(self.peaks) if self.peaks else np.array([], dtype=np.float64)
+
+
+class DetectionResult:
+    """
+    The detections of a file as sample intervals, without any per-sample arrays.
+
+    Attributes
+    ----------
+    starts, ends : numpy.ndarray
+        The start and (exclusive) end sample of each detection, after gap filling and short run removal.
+        An end may be n_samples, get_times gives the bounds written to the selections (get_selection_bounds).
+    n_samples : int
+        The number of samples in the file.
+    sample_rate : float
+        The sample rate the samples are at.
+    peaks : numpy.ndarray or None
+        The peak of the detector's signal (correlation, envelope or band energy ratio) in each detection,
+        None if the detector does not track it.
+    """
+    def __init__(self, starts, ends, n_samples, sample_rate, peaks=None) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.n_samples = n_samples
+        self.sample_rate = sample_rate
+        self.peaks = peaks
+
+    def __len__(self):
+        return len(self.starts)
+
+    def get_times(self):
+        """
+        Get the start and end of each detection in seconds.
+        """
+        starts, ends = get_selection_bounds(self.starts, self.ends, self.n_samples)
+        return starts / self.sample_rate, ends / self.sample_rate
+
+
+class IntervalJoiner:
+    """
+    Gap filling and short run removal for runs that arrive one file at a time, across file boundaries.
+
+    The files are treated as one continuous recording, so runs less than max_gap apart are joined
+    even when they are in different files. The last run of each file is kept open until the next
+    file shows whether it continues. Once the recording ends, finish applies the same end of file
+    rules as fill_small_gaps and remove_short_intervals, so a single file gives the same runs as those.
+    All samples are counted from the start of the first file.
+    """
+    def __init__(self, max_gap, min_len) -> None:
+        self.max_gap = max_gap
+        self.min_len = min_len
+        self.length = 0
+        self.open_run = None
+        # the first run of the recording has its gap from the start filled, and a recording without runs is one gap
+        self.has_runs = False
+
+    def update(self, starts, ends, n_samples):
+        """
+        Add the runs of the next file.
+
+        Parameters
+        ----------
+        starts, ends : numpy.ndarray
+            The start and (exclusive) end sample of each run in the file, from the start of the file.
+        n_samples : int
+            The number of samples in the file.
+
+        Returns
+        -------
+        starts, ends : numpy.ndarray
+            The runs that are finished, from the start of the first file.
+        """
+        starts = np.asarray(starts, dtype=np.int64) + self.length
+        ends = np.asarray(ends, dtype=np.int64) + self.length
+        if not self.has_runs and len(starts):
+            self.has_runs = True
+            if 0 < starts[0] < self.max_gap:
+                starts[0] = 0
+        if self.open_run is not None:
+            starts = np.concatenate(([self.open_run[0]], starts))
+            ends = np.concatenate(([self.open_run[1]], ends))
+        self.length += n_samples
+
+        keep_gap = (starts[1:] - ends[:-1]) >= self.max_gap
+        starts = starts[np.concatenate(([True], keep_gap))] if len(starts) else starts
+        ends = ends[np.concatenate((keep_gap, [True]))] if len(ends) else ends
+        if len(starts) and self.length - 1 - ends[-1] < self.max_gap:
+            # a run in the next file could still join this one, or the gap to the end of the file is filled
+            self.open_run = (starts[-1], ends[-1])
+            starts, ends = starts[:-1], ends[:-1]
+        else:
+            self.open_run = None
+
+        keep = (ends - starts) >= self.min_len
+        return starts[keep], ends[keep]
+
+    def finish(self):
+        """
+        End the recording, finishing the open run.
+
+        Returns
+        -------
+        starts, ends : numpy.ndarray
+            The open run, if it is kept. It may end at self.length, see get_selection_bounds.
+        """
+        if not self.has_runs:
+            # a recording shorter than max_gap with no runs is filled as one gap
+            starts, ends = fill_small_gaps([], [], self.length, self.max_gap)
+        elif self.open_run is None:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        else:
+            starts, ends = fill_small_gaps([self.open_run[0]], [self.open_run[1]], self.length, self.max_gap)
+        self.open_run = None
+        return remove_short_intervals(starts, ends, self.length, self.min_len)
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import tracemalloc
+import contextlib
+
+class StageProfiler:
+    """
+    Record the wall time, CPU time, peak memory and samples per second of each stage of detection.
+
+    Stages are timed with profile_stage while the profiler is active (use_profiler), e.g. 'load',
+    'highpass_filter', 'correlation' and 'envelope'. The stages run while detecting a file
+    (profile_file) are added up over the file, e.g. over the blocks of a streamed file, and recorded
+    once per file and stage when the file is finished. Each record is passed to every hook, such as
+    JsonLinesLog, and kept for print_summary.
+
+    Peak memory is the most memory allocated by numpy and Python (tracemalloc) during the stage
+    above what was allocated when it started. tracemalloc slows Python allocations down, so
+    trace_memory=False leaves it off when only times are wanted.
+
+    A profiler sent to worker processes keeps its records until they are sent back with pop_records,
+    and the hooks are only run in the process that made the profiler.
+
+    Parameters
+    ----------
+    hooks : list of callable, default ()
+        Called with each record, a dict.
+    trace_memory : bool, default True
+        True to record peak memory with tracemalloc, False to record None.
+    """
+    def __init__(self, hooks=(), trace_memory=True) -> None:
+        self.hooks = list(hooks)
+        self.trace_memory = trace_memory
+        self.records = []
+        # the file the stages are being recorded for, and its totals of each stage by name
+        self.filename = None
+        self.file_stages = {}
+        # peak memory of each stage being timed, outermost first, for stages that contain other stages
+        self.open_peaks = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['hooks'] = []
+        state['records'] = []
+        return state
+
+    def stage(self, name, n_samples=None):
+        return ProfiledStage(self, name, n_samples)
+
+    def file(self, filename):
+        return ProfiledFile(self, filename)
+
+    def add_stage(self, name, wall_time, cpu_time, peak_memory, n_samples):
+        stage = {'calls': 1, 'wall_time': wall_time, 'cpu_time': cpu_time, 'peak_memory': peak_memory, 'n_samples': n_samples}
+        if self.filename is None:
+            self.emit(self.get_record(None, name, stage))
+            return
+        totals = self.file_stages.get(name)
+        if totals is None:
+            self.file_stages[name] = stage
+            return
+        totals['calls'] += 1
+        totals['wall_time'] += wall_time
+        totals['cpu_time'] += cpu_time
+        if peak_memory is not None:
+            totals['peak_memory'] = max(totals['peak_memory'], peak_memory)
+        if n_samples is not None:
+            totals['n_samples'] = (totals['n_samples'] or 0) + n_samples
+
+    def get_record(self, filename, name, stage):
+        n_samples = stage['n_samples']
+        return {
+            'file': filename,
+            'stage': name,
+            **stage,
+            'samples_per_second': n_samples / stage['wall_time'] if n_samples and stage['wall_time'] > 0 else None,
+            'pid': os.getpid(),
+        }
+
+    def start_file(self, filename):
+        self.filename = filename
+        self.file_stages = {}
+
+    def end_file(self):
+        for name, stage in self.file_stages.items():
+            self.emit(self.get_record(self.filename, name, stage))
+        self.filename = None
+        self.file_stages = {}
+
+    def emit(self, record):
+        self.records.append(record)
+        for hook in self.hooks:
+            hook(record)
+
+    def pop_records(self):
+        """
+        Remove and return the records so far, to send them from a worker process to add_records.
+        """
+        records, self.records = self.records, []
+        return records
+
+    def add_records(self, records):
+        for record in records:
+            self.emit(record)
+
+    def get_summary(self):
+        """
+        Add up the records of each stage.
+
+        Returns
+        -------
+        dict
+            The number of files, calls, total wall and CPU time, largest peak memory, samples and samples per second of each stage.
+        """
+        summary = {}
+        for record in self.records:
+            stage = summary.setdefault(record['stage'], {'files': set(), 'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'peak_memory': None, 'n_samples': 0})
+            stage['files'].add(record['file'])
+            stage['calls'] += record['calls']
+            stage['wall_time'] += record['wall_time']
+            stage['cpu_time'] += record['cpu_time']
+            if record['peak_memory'] is not None:
+                stage['peak_memory'] = max(stage['peak_memory'] or 0, record['peak_memory'])
+            stage['n_samples'] += record['n_samples'] or 0
+        for stage in summary.values():
+            stage['files'] = len(stage['files'] - {None})
+            stage['samples_per_second'] = stage['n_samples'] / stage['wall_time'] if stage['n_samples'] and stage['wall_time'] > 0 else None
+        return summary
+
+    def print_summary(self):
+        print(f"{'stage':20s} {'files':>6s} {'calls':>7s} {'wall (s)':>10s} {'cpu (s)':>10s} {'peak (MB)':>10s} {'samples/s':>12s}")
+        for name, stage in self.get_summary().items():
+            peak = '' if stage['peak_memory'] is None else f"{stage['peak_memory'] / 1e6:.1f}"
+            rate = '' if stage['samples_per_second'] is None else f"{stage['samples_per_second']:.3g}"
+            print(f"{name:20s} {stage['files']:6d} {stage['calls']:7d} {stage['wall_time']:10.3f} {stage['cpu_time']:10.3f} {peak:>10s} {rate:>12s}")
+
+
+class ProfiledStage:
+    """
+    Times one run of a stage for a StageProfiler. n_samples can be set inside the with block once it is known.
+    """
+    def __init__(self, profiler, name, n_samples=None) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.n_samples = n_samples
+
+    def __enter__(self):
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            self.start_memory, peak = tracemalloc.get_traced_memory()
+            # keep the peak so far of the stage this one is inside, then measure this stage's own peak
+            if self.profiler.open_peaks:
+                self.profiler.open_peaks[-1] = max(self.profiler.open_peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self.profiler.open_peaks.append(0)
+        else:
+            self.start_memory = None
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_time = time.perf_counter() - self.start_wall
+        cpu_time = time.process_time() - self.start_cpu
+        peak_memory = None
+        if self.start_memory is not None:
+            # the peak since the last stage inside this one started, or since this one started
+            peak = max(self.profiler.open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+            peak_memory = max(peak - self.start_memory, 0)
+        if exc_type is None:
+            self.profiler.add_stage(self.name, wall_time, cpu_time, peak_memory, self.n_samples)
+        return False
+
+
+class ProfiledFile:
+    def __init__(self, profiler, filename) -> None:
+        self.profiler = profiler
+        self.filename = filename
+
+    def __enter__(self):
+        self.profiler.start_file(self.filename)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.end_file()
+        return False
+
+
+class JsonLinesLog:
+    """
+    StageProfiler hook that appends each record to a JSON lines file.
+
+    Parameters
+    ----------
+    log_path : String
+        The path of the log. Appended to if it exists.
+    """
+    def __init__(self, log_path) -> None:
+        self.log_path = log_path
+        self.file = open(log_path, "a")
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _NullStage:
+    """
+    Stands in for ProfiledStage and ProfiledFile when no profiler is active, doing nothing.
+    """
+    n_samples = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+# the profiler stages are recorded to, None when profiling is off
+_active_profiler = None
+
+def get_profiler():
+    return _active_profiler
+
+def set_profiler(profiler):
+    """
+    Make profiler the active profiler, starting tracemalloc if it records memory. Returns the previous one.
+    """
+    global _active_profiler
+    previous, _active_profiler = _active_profiler, profiler
+    if profiler is not None and profiler.trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return previous
+
+@contextlib.contextmanager
+def use_profiler(profiler):
+    """
+    Record stages to profiler inside the with block. tracemalloc is stopped afterwards if it was started for it.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    previous = set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_profiler(previous)
+        if not was_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+def profile_stage(name, n_samples=None):
+    """
+    Time a stage with the active profiler, as a with block. Does nothing when no profiler is active.
+    """
+    if _active_profiler is None:
+        return _NULL_STAGE
+    return _active_profiler.stage(name, n_samples)
+
+def profile_file(filename):
+    """
+    Record the stages in the with block as part of filename with the active profiler. Does nothing when no profiler is active.
+    """
+    if _active_profiler is None:
+        return _NULL_STAGE
+    return _active_profiler.file(filename)
+
+def pop_records():
+    """
+    Remove and return the records of the active profiler, an empty list when no profiler is active.
+    """
+    if _active_profiler is None:
+        return []
+    return _active_profiler.pop_records()
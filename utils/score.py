@@ -1,10 +1,7 @@
 import os
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 from utils.filesystem.selectionfiles import SelectionFiles
-from utils.segment import Segments
-from sklearn.metrics import balanced_accuracy_score
+from utils.segment import Segments, get_coverage_of_segments
 
 # To score the accuracy of the detectors
 
@@ -66,6 +63,9 @@ class SCORE:
         return balanced_accuracy_score
 
     def confusion_matrix(self):
+        # plotting libraries are only imported when a confusion matrix is plotted
+        import seaborn as sns
+        import matplotlib.pyplot as plt
         self.score_count = self.scores['Label'].value_counts()
         print(self.score_count)
         try:
@@ -114,10 +114,24 @@ class SCORE:
         plt.title(f'Confusion Matrix for {self.detector_name} model\n\nPrecision = {self.calc_precision():.4f}, Recall = {self.calc_recall():.4f}, F1-score = {self.calc_f1_score():.4f}\nBalanced Accuracy = {self.calc_balanced_accuracy():.4f}')
         plt.show()
 
-    def scores_for_pr_curve(self, tag_name='Brachyphisis'):
+    def scores_for_pr_curve(self, tag_name='Brachyphisis', selections=None, man_annotation=None):
+        """
+        Score the detector's selections against the manual annotations.
 
-        man_annotation = self.manual_selection.combine_selection_files()
-        selections = self.detector_selection.combine_selection_files()
+        Parameters
+        ----------
+        tag_name : String, default 'Brachyphisis'
+        selections : pandas.DataFrame or None, default None
+            The detector's selections, e.g. from detectors.BaseDetector.sweep. If None read self.detector_selection.
+        man_annotation : pandas.DataFrame or None, default None
+            The manual annotations. If None read self.manual_selection.
+        """
+        if man_annotation is None:
+            man_annotation = self.manual_selection.combine_selection_files()
+        if selections is None:
+            selections = self.detector_selection.combine_selection_files()
+        else:
+            selections = selections.sort_values(by='Begin Time (s)', ascending=True)
 
         man_annotation=man_annotation[man_annotation['View'] == 'Spectrogram 1']
         self.man_annotation=man_annotation[man_annotation['Tags'] == tag_name]
@@ -130,6 +144,32 @@ class SCORE:
 
         return self.score_count
 
+    def scores_for_sweep(self, sweep_results, tag_name='Brachyphisis'):
+        """
+        Score every combination of a parameter sweep, reading the manual annotations once.
+
+        Parameters
+        ----------
+        sweep_results : list of tuple(dict, pandas.DataFrame)
+            The parameters and selections of each combination, from detectors.BaseDetector.sweep.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The parameters, score counts, precision and recall of each combination, for a precision-recall curve.
+        """
+        man_annotation = self.manual_selection.combine_selection_files()
+        rows = []
+        for params, selections in sweep_results:
+            score_count = self.scores_for_pr_curve(tag_name, selections, man_annotation)
+            counts = {label: int(score_count.get(label, 0)) for label in ['True Positive', 'False Positive', 'False Negative', 'True Negative']}
+            predicted = counts['True Positive'] + counts['False Positive']
+            actual = counts['True Positive'] + counts['False Negative']
+            counts['Precision'] = counts['True Positive'] / predicted if predicted else float('nan')
+            counts['Recall'] = counts['True Positive'] / actual if actual else float('nan')
+            rows.append({**params, **counts})
+        return pd.DataFrame(rows)
+
     def scores_for_model(self, write_file, tag_name='Brachyphisis'):
 
         man_annotation = self.manual_selection.combine_selection_files()
@@ -158,51 +198,17 @@ class SCORE:
         segment_len: int
             length of segments in seconds
         """
-        total_time = self.detector_selection.total_files * self.detector_selection.FILE_LENGTH
+        total_time = self.detector_selection.get_total_time()
         self.segments = Segments(self.segment_length, total_time)
 
-        man_index = 0 #index of man_annotations
-        sel_index = 0 #index of selections
-        for seg in self.segments.segments_list:
-            man_row = self.man_annotation.iloc[man_index]
-            sel_row = self.selections.iloc[sel_index]
-
-            man_in_segment = seg.annotation_in_segment(man_row)
-            
-            while (man_in_segment):
-                # while manual annotation is in this segment
-                if seg.seg_score != self.MANUAL_ANNOTATION:
-                    seg.seg_score = self.MANUAL_ANNOTATION
-                
-                seg.update_man_coverage(man_row)
-
-                if (man_row["End Time (s)"] <= seg.end_time):
-                    if man_index < len(self.man_annotation) - 1:
-                        man_index += 1
-                        man_row = self.man_annotation.iloc[man_index]
-                        man_in_segment = seg.annotation_in_segment(man_row)
-                    else:
-                        man_in_segment = False
-                else:
-                    man_in_segment = False
-
-            sel_in_segment = seg.annotation_in_segment(sel_row)
-            while (sel_in_segment):
-                # while detector annotation is in this segment
-                if abs(seg.seg_score) != abs(self.DETECTOR_ANNOTATION):
-                    seg.seg_score += self.DETECTOR_ANNOTATION
-                
-                seg.update_detector_coverage(sel_row)
-
-                if (sel_row["End Time (s)"] <= seg.end_time):
-                    if sel_index < len(self.selections) - 1:
-                        sel_index += 1
-                        sel_row = self.selections.iloc[sel_index]
-                        sel_in_segment = seg.annotation_in_segment(sel_row)
-                    else:
-                        sel_in_segment = False
-                else:
-                    sel_in_segment = False   
+        man_coverage, man_in_segment = get_coverage_of_segments(self.man_annotation["Begin Time (s)"], self.man_annotation["End Time (s)"],
+                                                                self.segment_length, self.segments.number_of_segments)
+        sel_coverage, sel_in_segment = get_coverage_of_segments(self.selections["Begin Time (s)"], self.selections["End Time (s)"],
+                                                                self.segment_length, self.segments.number_of_segments)
+        # manual only = FALSE_NEG, detector only = FALSE_POS, both = TRUE_POS, neither = TRUE_NEG
+        self.segments.manual_coverage[:] = man_coverage
+        self.segments.detector_coverage[:] = sel_coverage
+        self.segments.seg_scores[:] = self.MANUAL_ANNOTATION * man_in_segment + self.DETECTOR_ANNOTATION * sel_in_segment
 
         return self.segments
 
@@ -210,14 +216,14 @@ class SCORE:
         value_map = {self.FALSE_NEG: 'False Negative', self.TRUE_POS: 'True Positive', self.TRUE_NEG: 'True Negative', self.FALSE_POS: 'False Positive'}
     
         df = pd.DataFrame({
-            'Begin Time': [seg.start_time for seg in self.segments.segments_list],
-            'End Time': [seg.end_time for seg in self.segments.segments_list],
+            'Begin Time': self.segments.start_times,
+            'End Time': self.segments.end_times,
             'Low Freq (Hz)': 17000,
             'High Freq (Hz)': 40000,
             'Tags': 'Brachyphisis',
-            'Label': [value_map[seg.seg_score] for seg in self.segments.segments_list],
-            'Manual Coverage of Segment (s)': [seg.manual_annot_coverage / seg.segment_length for seg in self.segments.segments_list],
-            'Dectector Coverage of Segment (s)': [seg.detector_annot_coverage / seg.segment_length for seg in self.segments.segments_list],
+            'Label': pd.Series(self.segments.seg_scores).map(value_map),
+            'Manual Coverage of Segment (s)': self.segments.manual_coverage / self.segments.segment_length,
+            'Dectector Coverage of Segment (s)': self.segments.detector_coverage / self.segments.segment_length,
         })
 
         return df
@@ -1,30 +1,105 @@
 
-from typing import List
+import numpy as np
 
 
 class Segments:
+    """
+    The segments a deployment is split into for scoring, stored as columns of arrays.
+
+    The start and end times follow from the segment number, so only the manual coverage,
+    detector coverage and score are stored, 17 bytes per segment. Indexing or iterating
+    gives Segment views onto the arrays.
+
+    Parameters
+    ----------
+    segment_length : int
+        The length of each segment in seconds.
+    total_time : int or float
+        The length of the deployment in seconds.
+    """
     def __init__(self, segment_length, total_time) -> None:
         self.segment_length = segment_length
-        self.number_of_segments = total_time // segment_length
-        self.segments_list = self.create_segment_list()
+        # the real length of a deployment need not be a whole number of segments
+        self.number_of_segments = int(total_time // segment_length)
+        # seconds of each segment covered by manual and detector annotations
+        self.manual_coverage = np.zeros(self.number_of_segments, dtype=np.float64)
+        self.detector_coverage = np.zeros(self.number_of_segments, dtype=np.float64)
+        # SCORE value of each segment
+        self.seg_scores = np.zeros(self.number_of_segments, dtype=np.int8)
+
+    @property
+    def start_times(self):
+        return np.arange(self.number_of_segments) * self.segment_length
+
+    @property
+    def end_times(self):
+        return self.start_times + self.segment_length
+
+    @property
+    def segments_list(self):
+        # the segments are a sequence of Segment views themselves
+        return self
+
+    def __len__(self):
+        return self.number_of_segments
+
+    def __getitem__(self, seg_num):
+        if seg_num < 0:
+            seg_num += self.number_of_segments
+        if not 0 <= seg_num < self.number_of_segments:
+            raise IndexError("segment index out of range")
+        return Segment(self, seg_num)
 
-    def create_segment_list(self):
-        segment_list: List[Segment] = []
+    def __iter__(self):
         for seg_num in range(self.number_of_segments):
-            start = seg_num * self.segment_length
-            end = start + self.segment_length
-            segment_list.append(Segment(start,end,seg_num))
-        return segment_list
+            yield Segment(self, seg_num)
+
 
 class Segment:
-    def __init__(self, start, end, seg_num) -> None:
-        self.start_time = start
-        self.end_time = end
-        self.segment_length = end - start
+    """
+    View of one segment of a Segments.
+    """
+    __slots__ = ('segments', 'seg_num')
+
+    def __init__(self, segments, seg_num) -> None:
+        self.segments = segments
         self.seg_num = seg_num
-        self.manual_annot_coverage = 0
-        self.detector_annot_coverage = 0
-        self.seg_score = 0
+
+    @property
+    def start_time(self):
+        return self.seg_num * self.segments.segment_length
+
+    @property
+    def end_time(self):
+        return self.start_time + self.segments.segment_length
+
+    @property
+    def segment_length(self):
+        return self.end_time - self.start_time
+
+    @property
+    def manual_annot_coverage(self):
+        return self.segments.manual_coverage[self.seg_num]
+
+    @manual_annot_coverage.setter
+    def manual_annot_coverage(self, value):
+        self.segments.manual_coverage[self.seg_num] = value
+
+    @property
+    def detector_annot_coverage(self):
+        return self.segments.detector_coverage[self.seg_num]
+
+    @detector_annot_coverage.setter
+    def detector_annot_coverage(self, value):
+        self.segments.detector_coverage[self.seg_num] = value
+
+    @property
+    def seg_score(self):
+        return int(self.segments.seg_scores[self.seg_num])
+
+    @seg_score.setter
+    def seg_score(self, value):
+        self.segments.seg_scores[self.seg_num] = value
 
     def annotation_in_segment(self,annotation_row):
         # for annotation to be in segment there are 3 cases:
@@ -59,3 +134,54 @@ class Segment:
 
     def update_detector_coverage(self, annotation_row):
         self.detector_annot_coverage += self.get_coverage_for_segment(annotation_row)
+
+
+def get_coverage_of_segments(begin_times, end_times, segment_length, number_of_segments):
+    """
+    Get how much of each segment is covered by annotations, without looping over segments.
+
+    Gives the same values as Segment.annotation_in_segment and Segment.get_coverage_for_segment
+    summed over the annotations in each segment, for segments starting at 0 and segment_length apart.
+
+    Parameters
+    ----------
+    begin_times, end_times : array-like
+        The begin and end times in seconds of the annotations, sorted by begin time.
+    segment_length : int or float
+        The length of each segment in seconds.
+    number_of_segments : int
+
+    Returns
+    -------
+    coverage : numpy.ndarray
+        The seconds of each segment covered by annotations.
+    in_segment : numpy.ndarray
+        True for each segment with at least one annotation in it.
+    """
+    begin_times = np.asarray(begin_times, dtype=np.float64)
+    end_times = np.asarray(end_times, dtype=np.float64)
+    segment_starts = np.arange(number_of_segments) * segment_length
+    segment_ends = segment_starts + segment_length
+
+    # the first segment an annotation is in is the last one starting at or before it,
+    # and it is in every segment that starts before it ends
+    first = np.maximum(np.searchsorted(segment_starts, begin_times, side='right') - 1, 0)
+    last = np.searchsorted(segment_starts, end_times, side='left') - 1
+    # an annotation with no length is only in the segment it is at
+    last = np.where(begin_times >= end_times, first, last)
+    if number_of_segments:
+        # annotations after the last segment are in no segment
+        first = np.where(begin_times >= segment_ends[-1], number_of_segments, first)
+    last = np.minimum(last, number_of_segments - 1)
+
+    # one entry per (annotation, segment) pair, in annotation order
+    counts = np.maximum(last - first + 1, 0)
+    annotation_index = np.repeat(np.arange(len(begin_times)), counts)
+    pair_starts = np.cumsum(counts) - counts
+    segment_index = first[annotation_index] + (np.arange(len(annotation_index)) - pair_starts[annotation_index])
+
+    overlap = np.minimum(end_times[annotation_index], segment_ends[segment_index]) - np.maximum(begin_times[annotation_index], segment_starts[segment_index])
+    coverage = np.bincount(segment_index, weights=overlap, minlength=number_of_segments)
+    in_segment = np.zeros(number_of_segments, dtype=bool)
+    in_segment[segment_index] = True
+    return coverage, in_segment
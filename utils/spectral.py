@@ -0,0 +1,76 @@
+import numpy as np
+import scipy.fft
+import scipy.signal as signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+# number of STFT frames transformed at a time, to bound the size of the spectra
+STFT_BLOCK_FRAMES = 4096
+
+
+def get_band_bins(sample_rate, n_fft, low_freq, high_freq=None):
+    """
+    The slice of the bins of an n_fft point rfft with centre frequencies from low_freq up to high_freq.
+    high_freq None goes up to the Nyquist frequency.
+    """
+    bin_freqs = scipy.fft.rfftfreq(n_fft, 1 / sample_rate)
+    if high_freq is None:
+        high_freq = sample_rate / 2
+    bins = np.flatnonzero((bin_freqs >= low_freq) & (bin_freqs <= high_freq))
+    if len(bins) == 0:
+        raise ValueError(f"No STFT bins between {low_freq} and {high_freq} Hz at a sample rate of {sample_rate} Hz")
+    return slice(bins[0], bins[-1] + 1)
+
+
+def stft_band_power(audio, sample_rate, bands, n_fft=256, hop=128, dtype=np.float32, start=0, n_frames=None, block_frames=STFT_BLOCK_FRAMES):
+    """
+    Mean power per frequency bin in each of several bands, for STFT frames hop samples apart.
+
+    Frame k is a Hann-windowed n_fft samples centred on sample start + k * hop of audio, with
+    zeros outside the array, so frame k of the whole file is at sample k * hop. The frames are
+    transformed block_frames at a time, so only the band powers are kept for the whole file.
+
+    Parameters
+    ----------
+    audio : numpy.ndarray
+    sample_rate : int
+    bands : list of tuple(float, float or None)
+        The (low, high) frequencies of each band in Hz, see get_band_bins.
+    n_fft : int, default 256
+        The number of samples in each frame.
+    hop : int, default 128
+        The number of samples between frames.
+    dtype : numpy dtype, default numpy.float32
+        The precision of the transform, numpy.float32 or numpy.float64.
+    start : int, default 0
+        The sample of audio the first frame is centred on.
+    n_frames : int or None, default None
+        The number of frames. If None, frames are centred on every hop samples from start to the end of audio.
+
+    Returns
+    -------
+    numpy.ndarray
+        Shape (n_frames, len(bands)).
+    """
+    dtype = np.dtype(dtype)
+    if n_frames is None:
+        n_frames = -(-(len(audio) - start) // hop)
+    window = signal.get_window('hann', n_fft).astype(dtype)
+    band_bins = [get_band_bins(sample_rate, n_fft, low_freq, high_freq) for low_freq, high_freq in bands]
+    half = n_fft // 2
+
+    band_power = np.empty((n_frames, len(bands)), dtype=dtype)
+    for first_frame in range(0, n_frames, block_frames):
+        last_frame = min(first_frame + block_frames, n_frames)
+        # the samples the block's frames cover, zero outside the audio
+        segment_start = start + first_frame * hop - half
+        segment_stop = start + (last_frame - 1) * hop - half + n_fft
+        segment = np.zeros(segment_stop - segment_start, dtype=dtype)
+        read_start, read_stop = max(segment_start, 0), min(segment_stop, len(audio))
+        if read_start < read_stop:
+            segment[read_start - segment_start:read_stop - segment_start] = audio[read_start:read_stop]
+        frames = sliding_window_view(segment, n_fft)[::hop]
+        spectrum = scipy.fft.rfft(frames * window, axis=1)
+        power = spectrum.real**2 + spectrum.imag**2
+        for band, bins in enumerate(band_bins):
+            band_power[first_frame:last_frame, band] = power[:, bins].mean(axis=1)
+    return band_power